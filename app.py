@@ -1,10 +1,10 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
 import os
-import cv2
 import numpy as np
-from models.skin_analysis import analyze_skin
-from models.recommender import recommend_skincare, recommend_makeup, recommend_products, init_db_connection, close_db_connection, fetch_gallery_products, fetch_product_details
+from models.skin_analysis import start_model_loading, model_status
+from models.pipeline import extract_face, analyze_face, estimate_face_color
+from models.recommender import recommend_products, init_db_connection, close_db_connection, fetch_gallery_products, fetch_product_details, start_catalog_index_loading, recommend_makeup_page, recommend_all, group_by_subcategory
 
 # Configure Streamlit page
 st.set_page_config(
@@ -15,10 +15,20 @@ st.set_page_config(
 )
 init_db_connection()
 
+# Keep the product catalog in memory so recommendations skip MySQL. It loads
+# in the background, once per process; MySQL answers until it is ready.
+start_catalog_index_loading()
+
+# Load the skin analysis model in the background so every page renders right away
+start_model_loading()
+
 # Configure upload folder
 UPLOAD_FOLDER = "static/uploads/"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Uploads are processed in memory; set SKIN_SAVE_UPLOADS=1 to also keep them on disk
+SAVE_UPLOADS = os.environ.get("SKIN_SAVE_UPLOADS", "0") == "1"
+
 # Apply light theme custom CSS
 st.markdown("""
     <style>
@@ -258,34 +268,107 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # Function to detect face and extract skin area
-def detect_face(image_path):
-    """Detects the face and extracts skin area from the image."""
+def detect_face(uploaded_file):
+    """Detects the face and extracts skin area from the uploaded image.
+
+    Returns the BGR face crop, or None if no face was found.
+    """
     try:
-        image = cv2.imread(image_path)
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        data = uploaded_file.getvalue()
+
+        # Optionally keep the upload and its face crop on disk
+        cropped_face_path = None
+        if SAVE_UPLOADS:
+            file_path = os.path.join(UPLOAD_FOLDER, uploaded_file.name)
+            with open(file_path, "wb") as f:
+                f.write(data)
+            cropped_face_path = os.path.splitext(file_path)[0] + "_face.jpg"
 
-        # Load OpenCV face detector
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(100, 100))
+        # Decode, detect and crop in memory
+        _, face_region = extract_face(data, save_path=cropped_face_path)
 
-        if len(faces) == 0:
+        if face_region is None:
             st.warning("No face detected. Please upload a clear image of your face.")
             return None
 
-        # Extract the largest detected face
-        x, y, w, h = sorted(faces, key=lambda f: f[2] * f[3], reverse=True)[0]
-        face_region = image[y:y+h, x:x+w]
-
-        # Save cropped face image
-        cropped_face_path = os.path.splitext(image_path)[0] + "_face.jpg"
-        cv2.imwrite(cropped_face_path, face_region)
-
-        return cropped_face_path
+        return face_region
 
     except Exception as e:
         st.error(f"Error processing image: {e}")
         return None
 
+
+def _load_more_makeup():
+    state = st.session_state.makeup_results
+    products, cursor = recommend_makeup_page(*state["profile"], after_id=state["cursor"])
+    group_by_subcategory(products, state["makeup"])
+    state["cursor"] = cursor
+
+
+@st.fragment
+def show_makeup_products(profile, first_page, next_cursor):
+    """Renders makeup recommendations page by page.
+
+    Only the first page (by subcategory) comes with the analysis; "Show more"
+    fetches the next keyset page and reruns just this fragment.
+    """
+    first_id = min(product["id"] for products in first_page.values() for product in products)
+    state = st.session_state.get("makeup_results")
+    if state is None or state["profile"] != profile or state["first_id"] != first_id:
+        state = st.session_state.makeup_results = {
+            "profile": profile, "first_id": first_id,
+            "makeup": {subcategory: list(products) for subcategory, products in first_page.items()},
+            "cursor": next_cursor,
+        }
+
+    # Create sections for different makeup categories
+    makeup_categories = {
+        "Foundation": [],
+        "Concealer": [],
+        "Blush": [],
+        "Eyeshadow": [],
+        "Lipstick": [],
+        "Other": []
+    }
+
+    # Categorize products
+    for subcategory, products in state["makeup"].items():
+        if subcategory in makeup_categories:
+            makeup_categories[subcategory].extend(products)
+        else:
+            makeup_categories["Other"].extend(products)
+
+    # Display products by category
+    for category, products in makeup_categories.items():
+        if products:
+            st.markdown(f"""
+                <div style="margin-top: 20px;">
+                    <h4 style="color: #4e95ed;">{category}</h4>
+                </div>
+            """, unsafe_allow_html=True)
+
+            for i in range(0, len(products), 3):
+                cols = st.columns(3)
+                for j in range(3):
+                    if i + j < len(products):
+                        product = products[i + j]
+                        with cols[j]:
+                            st.markdown(f"""
+                                <div class="card" style="height: 100%;">
+                                    <h4 style="color: #4e95ed; font-size: 18px;">{product['name']}</h4>
+                                    <p><strong>Shade:</strong> {product.get('shade', 'Best match for your tone')}</p>
+                                    <p><strong>Finish:</strong> {product.get('finish', 'Natural')}</p>
+                                    <p><strong>Undertone:</strong> {product.get('undertone', profile[4])}</p>
+                                    <p><strong>Recommendation:</strong> {product.get('makeup_recommendation', 'Perfect for your skin profile')}</p>
+                                    <a href="{product.get('link', '#')}" target="_blank">
+                                        <img src="{product.get('image_path', 'static/images/placeholder.png')}" style="width: 100%; margin-top: 10px;">
+                                    </a>
+                                </div>
+                            """, unsafe_allow_html=True)
+
+    if state["cursor"] is not None:
+        st.button("Show more makeup products", key="makeup_more", on_click=_load_more_makeup)
+
 # Sidebar Navigation
 with st.sidebar:
     st.markdown("""
@@ -452,6 +535,13 @@ elif selected == "Analyze":
         </div>
     """, unsafe_allow_html=True)
 
+    # Let the user know while the model is still loading in the background
+    status = model_status()
+    if status["state"] == "loading":
+        st.info("The skin analysis model is still loading. Your analysis will start as soon as it is ready.")
+    elif status["state"] == "error":
+        st.error(f"The skin analysis model failed to load: {status['error']}")
+
     # Near line 450, in the Analyze Page section
     # Upload Image
     # Create a unique key for the file uploader based on session state counter
@@ -459,8 +549,6 @@ elif selected == "Analyze":
         st.session_state.image_counter = 0
     if 'previous_image' not in st.session_state:
         st.session_state.previous_image = None
-    if 'model_state_id' not in st.session_state:
-        st.session_state.model_state_id = 0
         
     uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png"], 
                                     label_visibility="collapsed", 
@@ -472,21 +560,13 @@ elif selected == "Analyze":
         if 'skin_analysis_results' in st.session_state:
             del st.session_state.skin_analysis_results
         
-        # Increment model state ID to force model reload
-        st.session_state.model_state_id += 1
-        
         # Update the previous image and increment counter
         st.session_state.previous_image = uploaded_file.name
         st.session_state.image_counter += 1
         
-        # Save the uploaded file
-        file_path = os.path.join(UPLOAD_FOLDER, uploaded_file.name)
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        face_region = detect_face(uploaded_file)
 
-        cropped_face_path = detect_face(file_path)
-
-        if cropped_face_path:
+        if face_region is not None:
             # Show Images in a Card Layout
             st.markdown("""
                 <div class="card animated">
@@ -499,7 +579,7 @@ elif selected == "Analyze":
                 st.markdown("""
                     <div class="image-container">
                 """, unsafe_allow_html=True)
-                st.image(file_path, caption="Uploaded Image", use_container_width=True)
+                st.image(uploaded_file, caption="Uploaded Image", use_container_width=True)
                 st.markdown("""
                     </div>
                 """, unsafe_allow_html=True)
@@ -507,7 +587,7 @@ elif selected == "Analyze":
                 st.markdown("""
                     <div class="image-container">
                 """, unsafe_allow_html=True)
-                st.image(cropped_face_path, caption="Detected Face", use_container_width=True)
+                st.image(face_region, caption="Detected Face", channels="BGR", use_container_width=True)
                 st.markdown("""
                     </div>
                 """, unsafe_allow_html=True)
@@ -519,23 +599,45 @@ elif selected == "Analyze":
                 </div>
             """, unsafe_allow_html=True)
 
+            # While the model is not serving, estimate tone and undertone from the skin color
+            status = model_status()
+            estimate = None
+            if status["state"] != "ready":
+                try:
+                    estimate = estimate_face_color(face_region)
+                except ValueError as e:
+                    print(f"WARNING: Quick skin color estimate failed: {e}")
+            if estimate is not None and status["state"] != "error":
+                st.info(f"Quick estimate while the model loads: {estimate['skin_tone']} skin tone, "
+                        f"{estimate['skin_undertone']} undertone.")
+
+            degraded = status["state"] == "error" and estimate is not None
             try:
-                with st.spinner("Analyzing your skin..."):
-                    # Always force a refresh for new images
-                    try:
-                        # Store results in session state
-                        results = analyze_skin(cropped_face_path, force_refresh=True)
-                        st.session_state.skin_analysis_results = results
-                        skin_tone, skin_type, skin_concern, skin_texture, skin_undertone = results
-                    except ValueError as e:
-                        # Fallback for backward compatibility if the model doesn't return undertone yet
-                        results = analyze_skin(cropped_face_path, force_refresh=True)
-                        st.session_state.skin_analysis_results = results
-                        skin_tone, skin_type, skin_concern, skin_texture = results
-                        skin_undertone = "Neutral"  # Default value
-                    
-                    st.success("Analysis completed!")
-                    
+                if degraded:
+                    # Degraded mode: the model failed to load, so recommend on the
+                    # estimated tone and undertone; empty attributes match every product
+                    st.warning("The skin analysis model is unavailable right now. These results use your "
+                               "estimated skin tone and undertone only.")
+                    skin_tone, skin_undertone = estimate["skin_tone"], estimate["skin_undertone"]
+                    skin_type = skin_concern = skin_texture = ""
+                else:
+                    with st.spinner("Analyzing your skin..."):
+                        # The model stays resident; only the image changes between uploads
+                        try:
+                            # Store results in session state
+                            results = analyze_face(face_region)
+                            st.session_state.skin_analysis_results = results
+                            skin_tone, skin_type, skin_concern, skin_texture, skin_undertone = results
+                        except ValueError as e:
+                            # Fallback for backward compatibility if the model doesn't return undertone yet
+                            results = analyze_face(face_region)
+                            st.session_state.skin_analysis_results = results
+                            skin_tone, skin_type, skin_concern, skin_texture = results
+                            skin_undertone = "Neutral"  # Default value
+
+                        st.success("Analysis completed!")
+
+
                 # Display Results
                 col1, col2 = st.columns(2)
                 with col1:
@@ -565,7 +667,8 @@ elif selected == "Analyze":
                                 </tr>
                             </table>
                         </div>
-                    """.format(skin_tone, skin_type, skin_concern, skin_texture, skin_undertone), unsafe_allow_html=True)
+                    """.format(skin_tone, skin_type or "Not estimated", skin_concern or "Not estimated",
+                               skin_texture or "Not estimated", skin_undertone), unsafe_allow_html=True)
                 
                 with col2:
                     st.markdown("""
@@ -584,6 +687,17 @@ elif selected == "Analyze":
                         </div>
                     """, unsafe_allow_html=True)
 
+                profile = (skin_tone, skin_type, skin_concern, skin_texture, skin_undertone)
+                if degraded:
+                    # Skincare is chosen by type, concern and texture; with only the tone known it
+                    # would list every skincare product, so show the first page of makeup only
+                    makeup, makeup_cursor = recommend_makeup_page(*profile)
+                    recommendations = {"skincare": [], "makeup": group_by_subcategory(makeup),
+                                       "makeup_cursor": makeup_cursor}
+                else:
+                    # Skincare products and the first page of makeup, in one database round trip
+                    recommendations = recommend_all(profile)
+
                 # Create tabs for Skincare and Makeup recommendations
                 skincare_tab, makeup_tab = st.tabs(["Skincare Recommendations", "Makeup Recommendations"])
                 
@@ -596,10 +710,12 @@ elif selected == "Analyze":
                         </div>
                     """, unsafe_allow_html=True)
 
-                    # Use the specialized skincare recommendation function
-                    skincare_products = recommend_skincare(skin_tone, skin_type, skin_concern, skin_texture)
+                    skincare_products = recommendations["skincare"]
                     
-                    if skincare_products:
+                    if degraded:
+                        st.info("Skincare recommendations need your skin type, concern and texture. "
+                                "They will be back once the skin analysis model is available.")
+                    elif skincare_products:
                         for i in range(0, len(skincare_products), 3):
                             cols = st.columns(3)
                             for j in range(3):
@@ -629,55 +745,9 @@ elif selected == "Analyze":
                         </div>
                     """, unsafe_allow_html=True)
                     
-                    # Use the specialized makeup recommendation function with undertone
-                    makeup_products = recommend_makeup(skin_tone, skin_type, skin_concern, skin_texture, skin_undertone)
-                    
-                    if makeup_products:
-                        # Create sections for different makeup categories
-                        makeup_categories = {
-                            "Foundation": [],
-                            "Concealer": [],
-                            "Blush": [],
-                            "Eyeshadow": [],
-                            "Lipstick": [],
-                            "Other": []
-                        }
-                        
-                        # Categorize products
-                        for product in makeup_products:
-                            subcategory = product.get('subcategory', 'Other')
-                            if subcategory in makeup_categories:
-                                makeup_categories[subcategory].append(product)
-                            else:
-                                makeup_categories["Other"].append(product)
-                        
-                        # Display products by category
-                        for category, products in makeup_categories.items():
-                            if products:
-                                st.markdown(f"""
-                                    <div style="margin-top: 20px;">
-                                        <h4 style="color: #4e95ed;">{category}</h4>
-                                    </div>
-                                """, unsafe_allow_html=True)
-                                
-                                for i in range(0, len(products), 3):
-                                    cols = st.columns(3)
-                                    for j in range(3):
-                                        if i + j < len(products):
-                                            product = products[i + j]
-                                            with cols[j]:
-                                                st.markdown(f"""
-                                                    <div class="card" style="height: 100%;">
-                                                        <h4 style="color: #4e95ed; font-size: 18px;">{product['name']}</h4>
-                                                        <p><strong>Shade:</strong> {product.get('shade', 'Best match for your tone')}</p>
-                                                        <p><strong>Finish:</strong> {product.get('finish', 'Natural')}</p>
-                                                        <p><strong>Undertone:</strong> {product.get('undertone', skin_undertone)}</p>
-                                                        <p><strong>Recommendation:</strong> {product.get('makeup_recommendation', 'Perfect for your skin profile')}</p>
-                                                        <a href="{product.get('link', '#')}" target="_blank">
-                                                            <img src="{product.get('image_path', 'static/images/placeholder.png')}" style="width: 100%; margin-top: 10px;">
-                                                        </a>
-                                                    </div>
-                                                """, unsafe_allow_html=True)
+                    # Makeup matches the undertone too, and is shown one page at a time
+                    if recommendations["makeup"]:
+                        show_makeup_products(profile, recommendations["makeup"], recommendations["makeup_cursor"])
                     else:
                         st.info("No makeup products found matching your skin profile. We're expanding our makeup database to better serve you.")
                         
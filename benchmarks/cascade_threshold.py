@@ -0,0 +1,57 @@
+"""Sweeps the cascade margin: escalation rate, cost per image and agreement.
+
+Usage (from the repository root):
+    SKIN_CASCADE_FAST_BACKEND=tflite-int8 python -m benchmarks.cascade_threshold --margin 0.1 --margin 0.2
+
+Both tiers run once over the sample face crops in static/uploads. For each
+margin the table shows the share of images escalated to the full model, the
+resulting cost per image (fast pass on every image plus the full pass on the
+escalated ones) and how often the cascade's labels match the full model on
+every head.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from models.cascade import CASCADE_FAST_BACKEND, needs_escalation
+from models.export import representative_samples
+from models.skin_analysis import get_cascade, get_engine
+
+
+def _timed_predict(model, samples):
+    model.predict(samples[:1])  # Exclude tracing and allocation
+    start = time.perf_counter()
+    predictions = model.predict(samples)
+    return predictions, (time.perf_counter() - start) * 1000.0 / len(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--margin", type=float, action="append",
+                        help="Margin to evaluate (repeatable). Defaults to 0.05 to 0.5.")
+    args = parser.parse_args()
+
+    cascade = get_cascade()
+    if cascade is None:
+        raise SystemExit("Set SKIN_CASCADE_FAST_BACKEND to the fast tier's backend first")
+
+    samples = representative_samples()
+    fast, fast_ms = _timed_predict(cascade.fast, samples)
+    full, full_ms = _timed_predict(get_engine(), samples)
+    full_labels = np.stack([np.argmax(head, axis=1) for head in full], axis=1)
+    print(f"{len(samples)} samples: {CASCADE_FAST_BACKEND} {fast_ms:.2f} ms/img, "
+          f"{get_engine().backend} {full_ms:.2f} ms/img")
+
+    print(f"{'margin':>7s} {'escalated':>10s} {'ms/img':>8s} {'agreement':>10s}")
+    for margin in args.margin or [0.05, 0.1, 0.2, 0.3, 0.4, 0.5]:
+        escalate = needs_escalation(fast, margin)
+        labels = np.stack([np.argmax(head, axis=1) for head in fast], axis=1)
+        labels[escalate] = full_labels[escalate]
+        agreement = np.mean(np.all(labels == full_labels, axis=1))
+        cost = fast_ms + escalate.mean() * full_ms
+        print(f"{margin:7.2f} {escalate.mean():10.1%} {cost:8.2f} {agreement:10.1%}")
+
+
+if __name__ == "__main__":
+    main()
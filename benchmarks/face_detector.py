@@ -0,0 +1,77 @@
+"""Measures face detector overhead: per-call construction, caching, downscaling.
+
+Usage (from the repository root):
+    python -m benchmarks.face_detector --runs 10
+
+"per-call" builds a new CascadeClassifier from the XML file for every image,
+as detect_face in app.py used to. "cached" runs the same full-resolution
+search, with the same MIN_FACE_SIZE, on a Haar detector from the process-wide
+pool in models.face_detection, so the two differ only in construction.
+"downscaled" is the default detection path, which searches a copy scaled from
+the image dimensions. Each column also shows the number of faces found, so
+lost detections show up.
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from models.face_detection import HAAR_CASCADE_PATH, MIN_FACE_SIZE, MIN_NEIGHBORS, SCALE_FACTOR, detect_faces
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "uploads")
+
+
+def load_sample_images():
+    paths = sorted(
+        path for path in glob.glob(os.path.join(UPLOADS_DIR, "*"))
+        if path.lower().endswith((".jpg", ".jpeg", ".png")) and not path.endswith("_face.jpg")
+    )
+    images = [(os.path.basename(path), cv2.imread(path)) for path in paths]
+    return [(name, image) for name, image in images if image is not None]
+
+
+def detect_per_call(image):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    cascade = cv2.CascadeClassifier(HAAR_CASCADE_PATH)
+    return cascade.detectMultiScale(gray, scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS, minSize=MIN_FACE_SIZE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Detector construction alone, the overhead that caching removes
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        cv2.CascadeClassifier(HAAR_CASCADE_PATH)
+    construct_ms = (time.perf_counter() - start) * 1000.0 / args.runs
+    print(f"CascadeClassifier construction: {construct_ms:.2f} ms per call")
+
+    images = load_sample_images()
+    detect_faces(images[0][1], backend="haar")  # Load the pooled detector outside the timings
+    detectors = (
+        ("per-call", detect_per_call),
+        ("cached", lambda image: detect_faces(image, downscale=False, backend="haar")),
+        ("downscaled", lambda image: detect_faces(image, backend="haar")),
+    )
+    totals = {label: [] for label, _ in detectors}
+    for name, image in images:
+        row = []
+        for label, detect in detectors:
+            start = time.perf_counter()
+            for _ in range(args.runs):
+                faces = detect(image)
+            elapsed = (time.perf_counter() - start) * 1000.0 / args.runs
+            totals[label].append(elapsed)
+            row.append(f"{label}={elapsed:8.2f} ms ({len(faces)})")
+        print(f"{name[:40]:40s} {image.shape[1]}x{image.shape[0]:<5d} " + "  ".join(row))
+
+    print(f"{'mean':52s} " + "  ".join(f"{label}={np.mean(values):8.2f} ms" for label, values in totals.items()))
+
+
+if __name__ == "__main__":
+    main()
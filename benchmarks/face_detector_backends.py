@@ -0,0 +1,53 @@
+"""Compares face detector backends on the sample photos in static/uploads.
+
+Usage (from the repository root):
+    python -m benchmarks.face_detector_backends --runs 3
+
+For every backend in models.face_detection.FACE_DETECTORS this reports the
+mean latency per megapixel and the detection rate (share of photos with at
+least one face found). Backends whose model files are missing from
+SKIN_FACE_MODEL_DIR are reported and skipped.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.face_detector import load_sample_images
+from models.face_detection import FACE_DETECTORS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--backend", action="append", choices=sorted(FACE_DETECTORS),
+                        help="Backend to benchmark (repeatable). Defaults to all.")
+    args = parser.parse_args()
+
+    images = load_sample_images()
+    print(f"{len(images)} sample photos")
+    for backend in args.backend or list(FACE_DETECTORS):
+        try:
+            detector = FACE_DETECTORS[backend]()
+        except RuntimeError as e:
+            print(f"{backend:8s} skipped: {e}")
+            continue
+
+        ms_per_megapixel, ms_per_image, found = [], [], 0
+        for _, image in images:
+            detector.detect(image)  # Exclude first-call allocation
+            start = time.perf_counter()
+            for _ in range(args.runs):
+                faces = detector.detect(image)
+            elapsed = (time.perf_counter() - start) * 1000.0 / args.runs
+            megapixels = image.shape[0] * image.shape[1] / 1e6
+            ms_per_megapixel.append(elapsed / megapixels)
+            ms_per_image.append(elapsed)
+            found += bool(faces)
+
+        print(f"{backend:8s} {np.mean(ms_per_megapixel):8.2f} ms/MP  {np.mean(ms_per_image):8.2f} ms/image  "
+              f"detection rate {found}/{len(images)} ({found / len(images):.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compares full-size and reduced-scale decoding of the sample uploads.
+
+Usage (from the repository root):
+    python -m benchmarks.image_decode --runs 10
+
+"full" decodes every upload at its original size, as detect_face used to.
+"reduced" is models.pipeline.decode_image, which decodes large JPEGs at 1/2,
+1/4 or 1/8 scale. For each image the table shows decode time, the size of
+the decoded array and whether a face is still found in it.
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from models.face_detection import detect_largest_face
+from models.pipeline import DECODE_MIN_SIDE, decode_image
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "uploads")
+
+
+def load_sample_bytes():
+    paths = sorted(
+        path for path in glob.glob(os.path.join(UPLOADS_DIR, "*"))
+        if path.lower().endswith((".jpg", ".jpeg", ".png")) and not path.endswith("_face.jpg")
+    )
+    samples = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        if data:
+            samples.append((os.path.basename(path), data))
+    return samples
+
+
+def _time_decode(decode, data, runs):
+    image = decode(data)
+    start = time.perf_counter()
+    for _ in range(runs):
+        decode(data)
+    return image, (time.perf_counter() - start) * 1000.0 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--min-side", type=int, default=DECODE_MIN_SIDE)
+    args = parser.parse_args()
+
+    decoders = {
+        "full": lambda data: cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR),
+        "reduced": lambda data: decode_image(data, min_side=args.min_side),
+    }
+
+    print(f"{'image':32s} {'decoder':8s} {'size':>11s} {'decode ms':>10s} {'MB':>7s} face")
+    totals = {name: [0.0, 0] for name in decoders}
+    for name, data in load_sample_bytes():
+        for decoder, decode in decoders.items():
+            image, ms = _time_decode(decode, data, args.runs)
+            if image is None:
+                continue
+            found = detect_largest_face(image) is not None
+            totals[decoder][0] += ms
+            totals[decoder][1] += image.nbytes
+            size = f"{image.shape[1]}x{image.shape[0]}"
+            print(f"{name[:32]:32s} {decoder:8s} {size:>11s} {ms:10.2f} {image.nbytes / 1e6:7.1f} {'yes' if found else 'no'}")
+
+    for decoder, (ms, nbytes) in totals.items():
+        print(f"total {decoder:8s} decode={ms:8.2f} ms  decoded={nbytes / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
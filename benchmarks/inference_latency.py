@@ -0,0 +1,69 @@
+"""Compares per-call inference latency of the legacy and compiled paths.
+
+Usage (from the repository root):
+    python -m benchmarks.inference_latency --runs 50 --batch-size 8
+
+"legacy" reproduces the per-request code analyze_skin used to run:
+set_synchronous_execution, a tf.device('/CPU:0') scope and model.predict on
+a single image. "compiled" is the KerasBackend fixed-signature path the
+engine serves through now.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from models.backends import KerasBackend, configure_tensorflow
+from models.skin_analysis import MODEL_PATH, build_model
+
+
+def _time_calls(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return np.array(timings)
+
+
+def _report(label, timings, images_per_call=1):
+    print(f"{label:28s} p50={np.percentile(timings, 50):8.2f} ms  "
+          f"p95={np.percentile(timings, 95):8.2f} ms  "
+          f"throughput={images_per_call * 1000.0 / timings.mean():7.1f} img/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--xla", action="store_true", help="Also time the XLA-compiled path")
+    args = parser.parse_args()
+
+    configure_tensorflow()
+    model = tf.keras.models.load_model(MODEL_PATH) if os.path.exists(MODEL_PATH) else build_model()
+    single = np.random.default_rng(0).integers(0, 256, (1, 224, 224, 3), dtype=np.uint8)
+    batch = np.repeat(single, args.batch_size, axis=0)
+
+    def legacy():
+        tf.config.experimental.set_synchronous_execution(True)
+        with tf.device('/CPU:0'):
+            model.predict(single / 255.0, verbose=0)
+
+    legacy()  # Exclude one-time predict_function creation
+    _report("legacy model.predict (1)", _time_calls(legacy, args.runs))
+
+    variants = [("compiled", KerasBackend(model, max_batch_size=args.batch_size))]
+    if args.xla:
+        variants.append(("compiled+xla", KerasBackend(model, max_batch_size=args.batch_size, jit_compile=True)))
+
+    for name, backend in variants:
+        backend.predict(single)  # Trace the fixed signatures before timing
+        backend.predict(batch)
+        _report(f"{name} (1)", _time_calls(lambda: backend.predict(single), args.runs))
+        _report(f"{name} ({args.batch_size})", _time_calls(lambda: backend.predict(batch), args.runs), args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
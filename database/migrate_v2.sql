@@ -0,0 +1,123 @@
+-- Migrates the flat `products` table (the previous sql.sql layout) to the
+-- normalized, indexed schema in sql.sql.
+--
+-- Run against cosmetics_db:
+--     mysql -u root cosmetics_db < database/migrate_v2.sql
+--
+-- The old table is kept as `products_v1` until you drop it. Comma-separated
+-- skin_concern / skin_texture values become one junction row per value.
+-- Values that do not match a lookup or ENUM entry are listed by the check
+-- queries below; fix or delete those rows before running the rest.
+--
+-- MySQL commits every CREATE TABLE implicitly, so this script does not use a
+-- transaction. The new tables are built under staging names instead; the app
+-- only sees them after the single RENAME in step 5. If a run fails partway,
+-- fix the cause and run the whole script again: step 0 drops the leftovers.
+-- The mysql client stops at the first error.
+
+-- 0. Stop here if the database is already migrated (the new products table
+--    has no skin_concern column), then drop leftovers of a failed run
+SELECT `skin_concern` FROM `products` LIMIT 0;
+DROP TABLE IF EXISTS `product_concerns_v2`, `product_textures_v2`, `products_v2`;
+
+-- 1. Check for values the new schema cannot represent (should return no rows)
+SELECT DISTINCT `category` FROM `products` WHERE `category` NOT IN ('Skincare', 'Makeup');
+SELECT DISTINCT `skin_tone` FROM `products` WHERE `skin_tone` NOT IN ('Fair', 'Medium', 'Dark');
+SELECT DISTINCT `skin_type` FROM `products` WHERE `skin_type` NOT IN ('Normal', 'Dry', 'Oily', 'Combination', 'Sensitive');
+SELECT DISTINCT `undertone` FROM `products` WHERE `undertone` IS NOT NULL AND `undertone` NOT IN ('Cool', 'Neutral', 'Warm');
+
+-- 2. Lookup tables
+CREATE TABLE IF NOT EXISTS `skin_concerns` (
+  `id` tinyint(3) UNSIGNED NOT NULL AUTO_INCREMENT,
+  `name` varchar(50) NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_skin_concerns_name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `skin_textures` (
+  `id` tinyint(3) UNSIGNED NOT NULL AUTO_INCREMENT,
+  `name` varchar(50) NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_skin_textures_name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO `skin_concerns` (`name`) VALUES
+('Cystic Acne'), ('Blackheads'), ('Whiteheads'),
+('Hyperpigmentation'), ('Melasma'), ('Dark Spots'),
+('Fine Lines'), ('Wrinkles'), ('Aging'),
+('Dullness'), ('Dehydration'),
+('Redness'), ('Rosacea'), ('Irritation'), ('Sunburn');
+
+INSERT IGNORE INTO `skin_textures` (`name`) VALUES
+('Velvety'), ('Soft'), ('Smooth'),
+('Flaky'), ('Harsh'), ('Rough'),
+('Patchy'), ('Uneven'), ('Bumpy'),
+('Large Pores'),
+('Peeling'), ('Tight'), ('Scaly');
+
+-- 3. New products table, same ids
+CREATE TABLE `products_v2` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `name` varchar(255) NOT NULL,
+  `category` enum('Skincare','Makeup') NOT NULL,
+  `subcategory` varchar(50) DEFAULT NULL,
+  `skin_tone` enum('Fair','Medium','Dark') NOT NULL,
+  `skin_type` enum('Normal','Dry','Oily','Combination','Sensitive') NOT NULL,
+  `undertone` enum('Cool','Neutral','Warm') DEFAULT NULL,
+  `shade` varchar(50) DEFAULT NULL,
+  `finish` varchar(50) DEFAULT NULL,
+  `link` text NOT NULL,
+  `image_path` text NOT NULL,
+  `recommendation` text NOT NULL,
+  `makeup_recommendation` text DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_products_profile` (`category`, `skin_tone`, `skin_type`, `undertone`),
+  KEY `idx_products_name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO `products_v2` (
+  `id`, `name`, `category`, `subcategory`, `skin_tone`, `skin_type`, `undertone`,
+  `shade`, `finish`, `link`, `image_path`, `recommendation`, `makeup_recommendation`
+)
+SELECT `id`, `name`, TRIM(`category`), `subcategory`, TRIM(`skin_tone`), TRIM(`skin_type`), NULLIF(TRIM(`undertone`), ''),
+       `shade`, `finish`, `link`, `image_path`, `recommendation`, `makeup_recommendation`
+FROM `products`;
+
+-- 4. Junction tables, one row per listed concern / texture. Their foreign
+--    keys follow products_v2 when it is renamed to products.
+CREATE TABLE `product_concerns_v2` (
+  `product_id` int(11) NOT NULL,
+  `concern_id` tinyint(3) UNSIGNED NOT NULL,
+  PRIMARY KEY (`concern_id`, `product_id`),
+  KEY `idx_product_concerns_product` (`product_id`),
+  CONSTRAINT `fk_product_concerns_product` FOREIGN KEY (`product_id`) REFERENCES `products_v2` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `fk_product_concerns_concern` FOREIGN KEY (`concern_id`) REFERENCES `skin_concerns` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `product_textures_v2` (
+  `product_id` int(11) NOT NULL,
+  `texture_id` tinyint(3) UNSIGNED NOT NULL,
+  PRIMARY KEY (`texture_id`, `product_id`),
+  KEY `idx_product_textures_product` (`product_id`),
+  CONSTRAINT `fk_product_textures_product` FOREIGN KEY (`product_id`) REFERENCES `products_v2` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `fk_product_textures_texture` FOREIGN KEY (`texture_id`) REFERENCES `skin_textures` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO `product_concerns_v2` (`product_id`, `concern_id`)
+SELECT p.`id`, c.`id`
+FROM `products` p
+JOIN `skin_concerns` c ON FIND_IN_SET(c.`name`, REPLACE(p.`skin_concern`, ', ', ',')) > 0;
+
+INSERT INTO `product_textures_v2` (`product_id`, `texture_id`)
+SELECT p.`id`, t.`id`
+FROM `products` p
+JOIN `skin_textures` t ON FIND_IN_SET(t.`name`, REPLACE(p.`skin_texture`, ', ', ',')) > 0;
+
+-- 5. Swap all three tables in one atomic step
+RENAME TABLE `products` TO `products_v1`,
+             `products_v2` TO `products`,
+             `product_concerns_v2` TO `product_concerns`,
+             `product_textures_v2` TO `product_textures`;
+
+-- Once the app runs on the new schema:
+-- DROP TABLE `products_v1`;
@@ -0,0 +1,14 @@
+-- Adds the catalog version counter (see sql.sql) to a database already on
+-- the migrate_v2.sql schema.
+--
+-- Run once against cosmetics_db:
+--     mysql -u root cosmetics_db < database/migrate_v3.sql
+
+CREATE TABLE IF NOT EXISTS `catalog_version` (
+  `id` tinyint(3) UNSIGNED NOT NULL,
+  `version` bigint(20) UNSIGNED NOT NULL DEFAULT 0,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO `catalog_version` (`id`, `version`) VALUES (1, 0);
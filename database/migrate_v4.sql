@@ -0,0 +1,13 @@
+-- Adds the precomputed profile_recommendations table (see sql.sql) to a
+-- database already on the migrate_v3.sql schema.
+--
+-- Run once against cosmetics_db, then fill it with
+-- python -m models.profile_recommendations --table:
+--     mysql -u root cosmetics_db < database/migrate_v4.sql
+
+CREATE TABLE IF NOT EXISTS `profile_recommendations` (
+  `profile_code` smallint(5) UNSIGNED NOT NULL,
+  `product_rank` smallint(5) UNSIGNED NOT NULL,
+  `product_id` int(11) NOT NULL,
+  PRIMARY KEY (`profile_code`, `product_rank`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,147 @@
+"""asyncio versions of the recommender's database reads.
+
+Same queries, results, result cache, in-memory catalog index and
+instrumentation as models/recommender.py, but MySQL is read through an
+aiomysql pool (AsyncConnectionPool in models/db_pool.py), so independent
+queries overlap instead of running one after the other:
+
+    skincare, makeup = await asyncio.gather(
+        async_recommender.recommend_skincare(tone, skin_type, concern, texture),
+        async_recommender.recommend_makeup(tone, skin_type, concern, texture, undertone),
+    )
+
+Requires aiomysql (pip install aiomysql). Database errors are logged and
+answered with empty results, as in the blocking functions.
+"""
+import asyncio
+import weakref
+
+import pymysql
+
+from models.db_pool import AsyncConnectionPool
+from models.query_log import timed_call
+from models.recommender import (
+    GALLERY_QUERY, MAKEUP_COLUMNS, PRODUCT_DETAILS_QUERY, SKINCARE_COLUMNS, _cache_key, _current_catalog,
+    _makeup_query, _recommend_cache, _recommend_in_memory, _skincare_query,
+)
+
+# aiomysql pools cannot be shared across event loops, so there is one per loop
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_pool():
+    """Returns the connection pool of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = AsyncConnectionPool()
+    return pool
+
+
+def db_pool_stats():
+    """Returns occupancy and wait-time metrics of the running loop's pool."""
+    return get_pool().stats()
+
+
+async def close_db_connection():
+    """Closes the running loop's pool."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
+
+
+def _dict_cursor(connection):
+    import aiomysql
+
+    return connection.cursor(aiomysql.DictCursor)
+
+
+async def _cached(call, key, compute):
+    """recommender._cached for a coroutine function `compute`."""
+    result = _recommend_cache.get(key)
+    if result is None:
+        result = await compute()
+        _recommend_cache.put(key, result)
+    else:
+        call.source = "cache"
+    return result
+
+
+async def _select_skincare(call, skin_tone, skin_type, skin_concern, skin_texture):
+    catalog = _current_catalog()
+    if catalog is not None:
+        return _recommend_in_memory(call, catalog, SKINCARE_COLUMNS, category="Skincare", skin_tone=skin_tone,
+                                    skin_type=skin_type, skin_concern=skin_concern, skin_texture=skin_texture)
+
+    async with call.aconnection(get_pool()) as connection:
+        query, params = _skincare_query(call, skin_tone, skin_type, skin_concern, skin_texture)
+        async with _dict_cursor(connection) as cursor:
+            return await call.aexecute(cursor, query, params)
+
+
+async def recommend_skincare(skin_tone, skin_type, skin_concern, skin_texture):
+    """Async `recommender.recommend_skincare`."""
+    try:
+        with timed_call("recommend_skincare") as call:
+            key = _cache_key("recommend_skincare", skin_tone, skin_type, skin_concern, skin_texture)
+            products = await _cached(call, key, lambda: _select_skincare(call, skin_tone, skin_type, skin_concern,
+                                                                         skin_texture))
+            call.rows = len(products)
+            return list(products)
+
+    except pymysql.MySQLError as e:
+        print(f"DEBUG: Database error: {e}")
+        return []
+
+
+async def _select_makeup(call, skin_tone, skin_type, skin_concern, skin_texture, undertone):
+    catalog = _current_catalog()
+    if catalog is not None:
+        return _recommend_in_memory(call, catalog, MAKEUP_COLUMNS, category="Makeup", skin_tone=skin_tone,
+                                    skin_type=skin_type, skin_concern=skin_concern,
+                                    skin_texture=skin_texture, undertone=undertone)
+
+    async with call.aconnection(get_pool()) as connection:
+        query, params = _makeup_query(call, skin_tone, skin_type, skin_concern, skin_texture, undertone)
+        async with _dict_cursor(connection) as cursor:
+            return await call.aexecute(cursor, query, params)
+
+
+async def recommend_makeup(skin_tone, skin_type, skin_concern, skin_texture, undertone):
+    """Async `recommender.recommend_makeup`."""
+    try:
+        with timed_call("recommend_makeup") as call:
+            key = _cache_key("recommend_makeup", skin_tone, skin_type, skin_concern, skin_texture, undertone)
+            products = await _cached(call, key, lambda: _select_makeup(call, skin_tone, skin_type, skin_concern,
+                                                                       skin_texture, undertone))
+            call.rows = len(products)
+            return list(products)
+
+    except pymysql.MySQLError as e:
+        print(f"DEBUG: Database error: {e}")
+        return []
+
+
+async def fetch_product_details(product_name):
+    """Async `recommender.fetch_product_details`."""
+    try:
+        with timed_call("fetch_product_details") as call:
+            async with call.aconnection(get_pool()) as connection, _dict_cursor(connection) as cursor:
+                rows = await call.aexecute(cursor, PRODUCT_DETAILS_QUERY, (product_name,))
+                return rows[0] if rows else None
+
+    except pymysql.MySQLError as e:
+        print(f"DEBUG: Database error: {e}")
+        return None
+
+
+async def fetch_gallery_products(limit=20):
+    """Async `recommender.fetch_gallery_products`."""
+    try:
+        with timed_call("fetch_gallery_products") as call:
+            async with call.aconnection(get_pool()) as connection, _dict_cursor(connection) as cursor:
+                return await call.aexecute(cursor, GALLERY_QUERY, (limit,))
+
+    except pymysql.MySQLError as e:
+        print(f"DEBUG: Database error: {e}")
+        return []
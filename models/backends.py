@@ -0,0 +1,215 @@
+import os
+import threading
+
+import numpy as np
+
+# Supported inference backends and the model file each one serves from
+MODEL_DIR = os.path.dirname(__file__)
+MODEL_BASENAME = "est_fitzpatrick_skin_tone_model"
+BACKEND_FILES = {
+    "keras": MODEL_BASENAME + ".keras",
+    "tflite": MODEL_BASENAME + ".tflite",
+    "tflite-int8": MODEL_BASENAME + "_int8.tflite",
+    "onnx": MODEL_BASENAME + ".onnx",
+    "onnx-int8": MODEL_BASENAME + "_int8.onnx",
+}
+DEFAULT_BACKEND = os.environ.get("SKIN_MODEL_BACKEND", "keras")
+# Backends that run on the TensorFlow runtime; the ONNX ones never import it
+TENSORFLOW_BACKENDS = ("keras", "tflite", "tflite-int8")
+
+# TensorFlow runtime policy, applied once when the engine starts
+INFERENCE_DEVICE = os.environ.get("SKIN_INFERENCE_DEVICE", "cpu")
+INTRA_OP_THREADS = int(os.environ.get("SKIN_TF_INTRA_OP_THREADS", 0))  # 0 = TensorFlow default
+INTER_OP_THREADS = int(os.environ.get("SKIN_TF_INTER_OP_THREADS", 0))
+XLA_COMPILE = os.environ.get("SKIN_TF_XLA", "0") == "1"
+COMPILED_MAX_BATCH_SIZE = int(os.environ.get("SKIN_COMPILED_MAX_BATCH_SIZE", 8))
+
+_tensorflow_configured = False
+_configure_lock = threading.Lock()
+
+
+def model_path_for(backend):
+    """Returns the model file path a backend loads from."""
+    if backend not in BACKEND_FILES:
+        raise ValueError(f"Unknown inference backend '{backend}'. Options: {', '.join(BACKEND_FILES)}")
+    return os.path.join(MODEL_DIR, BACKEND_FILES[backend])
+
+
+def configure_tensorflow():
+    """Applies the device and threading policy once per process.
+
+    Thread pool sizes can only be set before TensorFlow executes its first op,
+    so this runs when the engine starts rather than on each request.
+    """
+    global _tensorflow_configured
+    with _configure_lock:
+        if _tensorflow_configured:
+            return
+        import tensorflow as tf
+
+        try:
+            if INTRA_OP_THREADS:
+                tf.config.threading.set_intra_op_parallelism_threads(INTRA_OP_THREADS)
+            if INTER_OP_THREADS:
+                tf.config.threading.set_inter_op_parallelism_threads(INTER_OP_THREADS)
+            # Ensure GPU memory growth when serving on GPU
+            if INFERENCE_DEVICE == "gpu":
+                for device in tf.config.list_physical_devices("GPU"):
+                    tf.config.experimental.set_memory_growth(device, True)
+        except RuntimeError as e:
+            print(f"WARNING: TensorFlow runtime already initialized, keeping its settings: {e}")
+        _tensorflow_configured = True
+
+
+def _as_input_dtype(batch, dtype):
+    """Converts a uint8 image batch to what an exported model expects.
+
+    Current exports take uint8 and scale inside the graph; models exported
+    before that take float32 in [0, 1].
+    """
+    batch = np.asarray(batch)
+    if np.dtype(dtype) == np.uint8:
+        if batch.dtype != np.uint8:
+            batch = np.rint(np.clip(batch, 0.0, 1.0) * 255).astype(np.uint8)
+        return batch
+    if batch.dtype == np.uint8:
+        return batch.astype(np.float32) / 255.0
+    return batch.astype(np.float32)
+
+
+def _order_outputs(outputs, head_names):
+    """Orders a {name: array} mapping by head name.
+
+    Converters do not always keep the Keras output names, so names that do not
+    match any head fall back to sorted-name order, which preserves the
+    original output order for the generic "output_0".."output_4" names.
+    """
+    if all(name in outputs for name in head_names):
+        return [np.asarray(outputs[name]) for name in head_names]
+    matched = []
+    for name in head_names:
+        candidates = [key for key in outputs if name in key]
+        if len(candidates) != 1:
+            return [np.asarray(outputs[key]) for key in sorted(outputs)]
+        matched.append(np.asarray(outputs[candidates[0]]))
+    return matched
+
+
+class KerasBackend:
+    """Serves the float32 Keras model through traced TensorFlow functions.
+
+    Instead of `model.predict`, which sets up a data pipeline on every call,
+    each batch size from 1 to `max_batch_size` gets its own concrete function
+    with a fixed input signature, traced (and XLA-compiled if `jit_compile`)
+    on first use and pinned to `device`. Larger batches run in chunks.
+
+    Batches are uint8 images; the cast and scaling to [0, 1] run inside the
+    traced graph.
+    """
+
+    name = "keras"
+
+    def __init__(self, model, max_batch_size=COMPILED_MAX_BATCH_SIZE, jit_compile=XLA_COMPILE, device=INFERENCE_DEVICE):
+        import tensorflow as tf
+
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.device = "/GPU:0" if device == "gpu" else "/CPU:0"
+        self.input_shape = tuple(model.input_shape[1:])
+        self._function = tf.function(self._forward, jit_compile=jit_compile)
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def _forward(self, batch):
+        import tensorflow as tf
+
+        return self.model(tf.cast(batch, tf.float32) / 255.0, training=False)
+
+    def concrete_function(self, batch_size):
+        """Returns the traced function for exactly `batch_size` images."""
+        function = self._signatures.get(batch_size)
+        if function is None:
+            import tensorflow as tf
+
+            with self._lock:
+                function = self._signatures.get(batch_size)
+                if function is None:
+                    spec = tf.TensorSpec((batch_size,) + self.input_shape, tf.uint8)
+                    with tf.device(self.device):
+                        function = self._function.get_concrete_function(spec)
+                    self._signatures[batch_size] = function
+        return function
+
+    def predict(self, batch):
+        batch = _as_input_dtype(batch, np.uint8)
+        chunks = []
+        for start in range(0, len(batch), self.max_batch_size):
+            chunk = batch[start:start + self.max_batch_size]
+            outputs = self.concrete_function(len(chunk))(chunk)
+            chunks.append([np.asarray(output) for output in outputs])
+        if len(chunks) == 1:
+            return chunks[0]
+        return [np.concatenate(head) for head in zip(*chunks)]
+
+
+class TFLiteBackend:
+    """Serves an exported .tflite model with the TFLite interpreter.
+
+    A TFLite interpreter is not thread-safe, so calls are serialized; the
+    micro-batcher already funnels concurrent sessions into one caller.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path, head_names, num_threads=None):
+        import tensorflow as tf
+
+        self.head_names = head_names
+        self._interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self._runner = self._interpreter.get_signature_runner()
+        self._input_name, input_details = next(iter(self._runner.get_input_details().items()))
+        self._input_dtype = input_details["dtype"]
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = _as_input_dtype(batch, self._input_dtype)
+        with self._lock:
+            outputs = self._runner(**{self._input_name: batch})
+        return _order_outputs(outputs, self.head_names)
+
+
+class OnnxBackend:
+    """Serves an exported .onnx model with ONNX Runtime on CPU."""
+
+    name = "onnx"
+
+    def __init__(self, model_path, head_names, num_threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("The ONNX backend requires onnxruntime (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.head_names = head_names
+        self._session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self._input_dtype = np.uint8 if model_input.type == "tensor(uint8)" else np.float32
+        self._output_names = [output.name for output in self._session.get_outputs()]
+
+    def predict(self, batch):
+        batch = _as_input_dtype(batch, self._input_dtype)
+        outputs = self._session.run(self._output_names, {self._input_name: batch})
+        return _order_outputs(dict(zip(self._output_names, outputs)), self.head_names)
+
+
+def load_backend(backend, model_path, head_names, num_threads=None):
+    """Opens an exported model file with the runtime for `backend`."""
+    if backend.startswith("tflite"):
+        return TFLiteBackend(model_path, head_names, num_threads=num_threads)
+    if backend.startswith("onnx"):
+        return OnnxBackend(model_path, head_names, num_threads=num_threads)
+    import tensorflow as tf
+    return KerasBackend(tf.keras.models.load_model(model_path))
@@ -0,0 +1,110 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Defaults can be overridden per deployment through the environment
+MAX_BATCH_SIZE = int(os.environ.get("SKIN_BATCH_MAX_SIZE", 8))
+MAX_WAIT_MS = float(os.environ.get("SKIN_BATCH_MAX_WAIT_MS", 5))
+PREDICT_TIMEOUT = float(os.environ.get("SKIN_PREDICT_TIMEOUT", 60))  # Seconds a caller waits for its batch
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-image inference requests into batches.
+
+    Callers from any thread `submit` one preprocessed sample. A worker thread
+    waits up to `max_wait_ms` after the first queued request for more requests
+    to arrive (or until `max_batch_size` are queued), runs them through
+    `predict_fn` as one batch and resolves each caller's future with its own
+    slice of every output head.
+
+    Larger batches and longer waits raise images/sec on CPU at the cost of
+    a few milliseconds of added latency for the first request in a batch.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batches_run = 0
+        self.images_run = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="skin-micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, sample):
+        """Queues one preprocessed sample and returns a Future of its per-head outputs."""
+        future = Future()
+        self._queue.put((np.asarray(sample), future))
+        return future
+
+    def predict(self, sample, timeout=PREDICT_TIMEOUT):
+        """Blocking helper: submits one sample and waits for its per-head outputs.
+
+        Raises concurrent.futures.TimeoutError after `timeout` seconds (None waits forever).
+        """
+        return self.submit(sample).result(timeout=timeout)
+
+    def close(self):
+        """Stops the worker after the requests already queued are served."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        """Returns batch counters, including the mean batch size achieved."""
+        return {
+            "batches": self.batches_run,
+            "images": self.images_run,
+            "mean_batch_size": self.images_run / self.batches_run if self.batches_run else 0.0,
+        }
+
+    def _run(self):
+        running = True
+        while running:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            requests = [first]
+            deadline = time.monotonic() + self.max_wait_ms / 1000.0
+            while len(requests) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                requests.append(item)
+
+            try:
+                self._run_batch(requests)
+            except Exception as e:
+                print(f"WARNING: Micro-batcher failed to resolve a batch: {e}")
+
+    def _run_batch(self, requests):
+        # Any failure, including outputs that cannot be split per request, goes
+        # to the callers' futures; the worker itself must keep serving
+        try:
+            batch = np.stack([sample for sample, _ in requests])
+            predictions = self.predict_fn(batch)
+            results = [[head[i] for head in predictions] for i in range(len(requests))]
+        except Exception as e:
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.images_run += len(requests)
+        for (_, future), result in zip(requests, results):
+            if not future.done():  # The caller may have cancelled it
+                future.set_result(result)
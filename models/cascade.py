@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+# Fast first-tier model. Empty disables the cascade; otherwise a backend name
+# such as "tflite-int8" or "keras" (see models/backends.py)
+CASCADE_FAST_BACKEND = os.environ.get("SKIN_CASCADE_FAST_BACKEND", "")
+# Model file of the fast tier; defaults to the backend's usual file, or
+# FAST_KERAS_MODEL for "keras"
+CASCADE_FAST_MODEL = os.environ.get("SKIN_CASCADE_FAST_MODEL", "")
+FAST_KERAS_MODEL = os.path.join(os.path.dirname(__file__), "est_fitzpatrick_skin_tone_model_mobilenet.keras")
+FAST_KERAS_BASE = "MobileNetV2"
+
+# Images whose top-1 minus top-2 probability is below this on any head are
+# re-run on the full model
+CASCADE_MARGIN = float(os.environ.get("SKIN_CASCADE_MARGIN", 0.2))
+
+
+def top1_margins(predictions):
+    """Returns a (batch, heads) array of top-1 minus top-2 probability per head."""
+    margins = []
+    for head in predictions:
+        head = np.asarray(head)
+        if head.shape[1] < 2:
+            margins.append(np.ones(len(head)))
+            continue
+        top2 = np.partition(head, -2, axis=1)[:, -2:]
+        margins.append(top2[:, 1] - top2[:, 0])
+    return np.stack(margins, axis=1)
+
+
+def needs_escalation(predictions, margin):
+    """Boolean mask of the samples with a top-1 margin below `margin` on any head."""
+    return (top1_margins(predictions) < margin).any(axis=1)
+
+
+class CascadePredictor:
+    """Runs a fast model first and escalates only unsure samples to the full model.
+
+    `fast` and `full` expose `predict(batch)` returning one array per output
+    head, like SkinAnalysisEngine. A sample is escalated when the fast model's
+    top-1 softmax margin is below `margin` on any head; escalated samples take
+    the full model's outputs for every head.
+
+    `stats()` reports the escalation rate and the average inference cost per
+    image, which is what the margin trades off.
+    """
+
+    def __init__(self, fast, full, margin=CASCADE_MARGIN):
+        self.fast = fast
+        self.full = full
+        self.margin = margin
+        self.images = 0
+        self.escalated = 0
+        self.fast_ms = 0.0
+        self.full_ms = 0.0
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.asarray(batch)
+        start = time.perf_counter()
+        predictions = [np.array(head) for head in self.fast.predict(batch)]
+        fast_ms = (time.perf_counter() - start) * 1000.0
+
+        escalate = np.flatnonzero(needs_escalation(predictions, self.margin))
+        full_ms = 0.0
+        if len(escalate):
+            start = time.perf_counter()
+            full_predictions = self.full.predict(batch[escalate])
+            full_ms = (time.perf_counter() - start) * 1000.0
+            for head, full_head in zip(predictions, full_predictions):
+                head[escalate] = full_head
+
+        with self._lock:
+            self.images += len(batch)
+            self.escalated += len(escalate)
+            self.fast_ms += fast_ms
+            self.full_ms += full_ms
+        return predictions
+
+    def reset_stats(self):
+        with self._lock:
+            self.images = self.escalated = 0
+            self.fast_ms = self.full_ms = 0.0
+
+    def stats(self):
+        """Returns escalation counters and the average cost per image in ms."""
+        with self._lock:
+            images = self.images
+            return {
+                "margin": self.margin,
+                "images": images,
+                "escalated": self.escalated,
+                "escalation_rate": self.escalated / images if images else 0.0,
+                "fast_ms_per_image": self.fast_ms / images if images else 0.0,
+                "full_ms_per_escalation": self.full_ms / self.escalated if self.escalated else 0.0,
+                "ms_per_image": (self.fast_ms + self.full_ms) / images if images else 0.0,
+            }
@@ -0,0 +1,169 @@
+import hashlib
+
+import numpy as np
+
+# Product columns held by the index, in the order they are loaded
+CATALOG_COLUMNS = [
+    "id", "name", "category", "subcategory", "skin_tone", "skin_type", "undertone",
+    "shade", "finish", "link", "image_path", "recommendation", "makeup_recommendation",
+]
+
+# Profile attributes the recommend functions filter on. Concerns and textures
+# are multi-valued (junction tables); the others are one value per product.
+FILTER_ATTRIBUTES = ["category", "skin_tone", "skin_type", "skin_concern", "skin_texture", "undertone"]
+MULTI_VALUED = ("skin_concern", "skin_texture")
+
+
+def _encode(values):
+    """Dictionary-encodes a column: returns (int32 codes, list of distinct values)."""
+    vocabulary, codes = {}, np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        codes[i] = vocabulary.setdefault(value, len(vocabulary))
+    return codes, list(vocabulary)
+
+
+def _key(value):
+    return str(value).strip().lower()
+
+
+class CatalogIndex:
+    """In-memory product catalog answering profile filters by bitmap intersection.
+
+    Every column is dictionary-encoded into an int32 NumPy array. Each value
+    of a filter attribute gets a packed bitmap (one bit per product), so a
+    recommendation filter is a handful of `bitwise_and`s over a few KB and
+    never touches MySQL. Matching is case-insensitive and an empty attribute
+    matches everything, like the SQL queries.
+
+    Args:
+        products (list): Product rows as dicts with the CATALOG_COLUMNS keys.
+        concerns (iterable): (product_id, concern name) pairs.
+        textures (iterable): (product_id, texture name) pairs.
+    """
+
+    def __init__(self, products, concerns=(), textures=()):
+        self.size = len(products)
+        self._columns = {
+            column: _encode([row.get(column) for row in products]) for column in CATALOG_COLUMNS
+        }
+        self.ids = np.array([row["id"] for row in products], dtype=np.int64)
+        position = {product_id: i for i, product_id in enumerate(self.ids.tolist())}
+
+        # Multi-valued attributes: members per product, displayed comma-separated as in SQL
+        members = {}
+        for attribute, pairs in (("skin_concern", concerns), ("skin_texture", textures)):
+            lists = [[] for _ in range(self.size)]
+            for product_id, name in pairs:
+                if product_id in position:
+                    lists[position[product_id]].append(name)
+            members[attribute] = lists
+            self._columns[attribute] = _encode([", ".join(names) or None for names in lists])
+
+        self._all = np.packbits(np.ones(self.size, dtype=bool))
+        self._bitmaps = {}
+        for attribute in FILTER_ATTRIBUTES:
+            masks = {}
+            if attribute in MULTI_VALUED:
+                for i, names in enumerate(members[attribute]):
+                    for name in names:
+                        masks.setdefault(_key(name), np.zeros(self.size, dtype=bool))[i] = True
+            else:
+                codes, values = self._columns[attribute]
+                for code, value in enumerate(values):
+                    if value is not None:
+                        mask = masks.setdefault(_key(value), np.zeros(self.size, dtype=bool))
+                        mask |= codes == code
+            self._bitmaps[attribute] = {value: np.packbits(mask) for value, mask in masks.items()}
+
+    @classmethod
+    def from_connection(cls, connection):
+        """Loads the catalog with three queries over the products schema in sql.sql."""
+        import pymysql
+
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        cursor.execute(f"SELECT {', '.join(CATALOG_COLUMNS)} FROM products ORDER BY id")
+        products = cursor.fetchall()
+        cursor.execute("""
+        SELECT pc.product_id, c.name FROM product_concerns pc
+        JOIN skin_concerns c ON c.id = pc.concern_id ORDER BY pc.product_id, c.id
+        """)
+        concerns = [(row["product_id"], row["name"]) for row in cursor.fetchall()]
+        cursor.execute("""
+        SELECT pt.product_id, t.name FROM product_textures pt
+        JOIN skin_textures t ON t.id = pt.texture_id ORDER BY pt.product_id, t.id
+        """)
+        textures = [(row["product_id"], row["name"]) for row in cursor.fetchall()]
+        cursor.close()
+        return cls(products, concerns, textures)
+
+    def match(self, **filters):
+        """Returns the row positions of the products matching every non-empty filter.
+
+        Keyword arguments are FILTER_ATTRIBUTES names; positions are in id order.
+        """
+        bits = self._all.copy()
+        for attribute, value in filters.items():
+            if not value:
+                continue
+            bitmap = self._bitmaps[attribute].get(_key(value))
+            if bitmap is None:
+                return np.empty(0, dtype=np.intp)
+            np.bitwise_and(bits, bitmap, out=bits)
+
+        # Unpack only the non-zero bytes; a filtered profile sets a few bits at most
+        nonzero = np.flatnonzero(bits)
+        set_bits = np.unpackbits(bits[nonzero][:, np.newaxis], axis=1).astype(bool)
+        return (nonzero[:, np.newaxis] * 8 + np.arange(8))[set_bits]
+
+    def rows(self, positions, columns):
+        """Decodes the given row positions into dicts with `columns` keys."""
+        decoded = []
+        for column in columns:
+            codes, values = self._columns[column]
+            decoded.append([values[code] for code in codes[positions].tolist()])
+        return [dict(zip(columns, row)) for row in zip(*decoded)]
+
+    def rows_by_id(self, ids, columns):
+        """Decodes the products with the given ids, in the given order; unknown ids are skipped."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not self.size:
+            return []
+        positions = np.minimum(np.searchsorted(self.ids, ids), self.size - 1)
+        return self.rows(positions[self.ids[positions] == ids], columns)
+
+    def page(self, columns, after_id, limit, **filters):
+        """One keyset page of matching products with ids greater than `after_id`.
+
+        Returns:
+            tuple: (rows, next_cursor); next_cursor is None on the last page.
+        """
+        positions = self.match(**filters)
+        start = np.searchsorted(self.ids[positions], after_id, side="right")
+        positions = positions[start:start + limit + 1]
+        if len(positions) > limit:
+            positions = positions[:limit]
+            return self.rows(positions, columns), int(self.ids[positions[-1]])
+        return self.rows(positions, columns), None
+
+    def query(self, columns, **filters):
+        """Filters the catalog and returns rows like the recommend SQL queries."""
+        return self.rows(self.match(**filters), columns)
+
+    def fingerprint(self):
+        """Digest of the product ids and every filter attribute's values.
+
+        Detects data built on another catalog, including edits that keep the
+        ids (an attribute change, or a repopulated table whose ids restart at 1).
+        """
+        digest = hashlib.blake2b(np.ascontiguousarray(self.ids).data, digest_size=16)
+        for attribute in FILTER_ATTRIBUTES:
+            codes, values = self._columns[attribute]
+            digest.update(np.ascontiguousarray(codes).data)
+            digest.update(repr(values).encode())
+        return digest.hexdigest()
+
+    def stats(self):
+        """Returns the product count and the memory held by codes and bitmaps."""
+        code_bytes = sum(codes.nbytes for codes, _ in self._columns.values())
+        bitmap_bytes = sum(b.nbytes for bitmaps in self._bitmaps.values() for b in bitmaps.values())
+        return {"products": self.size, "code_bytes": code_bytes, "bitmap_bytes": bitmap_bytes}
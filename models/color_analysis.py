@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+
+from models.skin_analysis import SKIN_TONE_LABELS, SKIN_UNDERTONE_LABELS
+
+# Face crops are shrunk to this size before masking; the mean color of a
+# few thousand skin pixels is as stable as that of a few million
+SAMPLE_SIZE = (128, 128)
+
+# Skin pixel thresholds (OpenCV 8-bit ranges)
+CR_RANGE = (133, 173)
+CB_RANGE = (77, 127)
+SKIN_HUE_MAX = 25   # Hue wraps at 180, so reddish skin is also >= 180 - SKIN_HUE_MAX
+SKIN_SAT_RANGE = (40, 200)
+SKIN_VALUE_MIN = 40
+
+# Below this share of skin pixels the mask is ignored and the whole crop is used
+MIN_SKIN_FRACTION = 0.05
+
+# Individual Typology Angle (degrees) boundaries: above FAIR_MIN_ITA is Fair
+# (very light and light), above DARK_MAX_ITA is Medium (intermediate and
+# tan), everything else is Dark (brown and dark)
+FAIR_MIN_ITA = 41.0
+DARK_MAX_ITA = 10.0
+
+# CIELAB hue angle h = atan2(b*, a*) in degrees: redder skin is cool,
+# yellower skin is warm
+COOL_MAX_HUE = 50.0
+WARM_MIN_HUE = 62.0
+
+
+def skin_mask(face):
+    """Boolean mask of the skin-colored pixels in a BGR image (YCrCb and HSV thresholds)."""
+    ycrcb = cv2.cvtColor(face, cv2.COLOR_BGR2YCrCb)
+    hsv = cv2.cvtColor(face, cv2.COLOR_BGR2HSV)
+    cr, cb = ycrcb[..., 1], ycrcb[..., 2]
+    hue, sat, val = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    return (
+        (cr >= CR_RANGE[0]) & (cr <= CR_RANGE[1])
+        & (cb >= CB_RANGE[0]) & (cb <= CB_RANGE[1])
+        & ((hue <= SKIN_HUE_MAX) | (hue >= 180 - SKIN_HUE_MAX))
+        & (sat >= SKIN_SAT_RANGE[0]) & (sat <= SKIN_SAT_RANGE[1])
+        & (val >= SKIN_VALUE_MIN)
+    )
+
+
+def skin_tone_from_ita(ita):
+    if ita > FAIR_MIN_ITA:
+        return SKIN_TONE_LABELS[0]
+    if ita > DARK_MAX_ITA:
+        return SKIN_TONE_LABELS[1]
+    return SKIN_TONE_LABELS[2]
+
+
+def undertone_from_hue(hue):
+    if hue < COOL_MAX_HUE:
+        return SKIN_UNDERTONE_LABELS[0]
+    if hue > WARM_MIN_HUE:
+        return SKIN_UNDERTONE_LABELS[2]
+    return SKIN_UNDERTONE_LABELS[1]
+
+
+def estimate_skin_color(face, channels="BGR"):
+    """Estimates skin tone and undertone from the mean CIELAB color of the skin pixels.
+
+    Runs in a few milliseconds without the model, so it works while the model
+    is loading or busy.
+
+    Args:
+        face (np.ndarray): Face crop, uint8 BGR (or RGB with channels="RGB").
+        channels (str): Channel order of `face`.
+
+    Returns:
+        dict: skin_tone and skin_undertone labels, plus the mean L*, a*, b*,
+              the ITA and hue angle in degrees, and the skin pixel fraction.
+    """
+    face = np.asarray(face)
+    if face.ndim != 3 or face.shape[2] != 3 or face.size == 0:
+        raise ValueError(f"Expected a color face crop of shape (H, W, 3), got {face.shape}")
+    if channels == "RGB":
+        face = cv2.cvtColor(face, cv2.COLOR_RGB2BGR)
+    face = cv2.resize(face, SAMPLE_SIZE, interpolation=cv2.INTER_AREA)
+
+    mask = skin_mask(face)
+    skin_fraction = float(mask.mean())
+    if skin_fraction < MIN_SKIN_FRACTION:
+        mask = np.ones(mask.shape, dtype=bool)
+
+    # float32 input in [0, 1] gives L* in [0, 100] and unscaled a*, b*
+    lab = cv2.cvtColor(face.astype(np.float32) / 255.0, cv2.COLOR_BGR2Lab)
+    lightness, a, b = lab[mask].mean(axis=0)
+
+    ita = float(np.degrees(np.arctan2(lightness - 50.0, b)))
+    hue = float(np.degrees(np.arctan2(b, a)))
+    return {
+        "skin_tone": skin_tone_from_ita(ita),
+        "skin_undertone": undertone_from_hue(hue),
+        "L": float(lightness),
+        "a": float(a),
+        "b": float(b),
+        "ita": ita,
+        "hue": hue,
+        "skin_fraction": skin_fraction,
+    }
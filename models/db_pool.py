@@ -0,0 +1,320 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import pymysql
+
+# Connection settings; the defaults match a local XAMPP install
+DB_SETTINGS = {
+    "host": os.environ.get("SKIN_DB_HOST", "localhost"),
+    "user": os.environ.get("SKIN_DB_USER", "root"),
+    "password": os.environ.get("SKIN_DB_PASSWORD", ""),  # Default XAMPP password
+    "database": os.environ.get("SKIN_DB_NAME", "cosmetics_db"),
+    "port": int(os.environ.get("SKIN_DB_PORT", 3306)),
+}
+
+POOL_SIZE = int(os.environ.get("SKIN_DB_POOL_SIZE", 8))
+ACQUIRE_TIMEOUT = float(os.environ.get("SKIN_DB_POOL_TIMEOUT", 5))  # Seconds
+POOL_RECYCLE = int(os.environ.get("SKIN_DB_POOL_RECYCLE", 3600))  # Seconds, below MySQL's wait_timeout
+
+
+class PoolTimeout(pymysql.err.OperationalError):
+    """No connection became free within the acquire timeout.
+
+    A pymysql error, so callers that already handle database errors handle it too.
+    """
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of pymysql connections.
+
+    Connections are opened lazily up to `size`. On checkout each one is
+    pinged, and reconnected (or replaced) if the server dropped it while it
+    sat idle, so sessions never get a dead socket after a wait_timeout.
+    When all `size` connections are in use, `acquire` waits up to `timeout`
+    seconds and then raises PoolTimeout.
+
+    Connections run in autocommit mode, so reads on a long-lived connection
+    always see the current catalog instead of an old transaction snapshot.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=ACQUIRE_TIMEOUT, **settings):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.timeout = timeout
+        self.settings = dict(DB_SETTINGS, **settings)
+        self.settings.setdefault("autocommit", True)
+        self._idle = []  # Stack, most recently used last, so spare connections can idle out
+        self._opened = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        # Signalled when a connection comes back or a slot frees, waking one waiting acquire
+        self._available = threading.Condition(self._lock)
+        self._local = threading.local()  # Wait of each thread's latest acquire
+
+        # Metrics
+        self.acquisitions = 0
+        self.waits = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.timeouts = 0
+        self.reconnects = 0
+
+    def _connect(self):
+        return pymysql.connect(**self.settings)
+
+    def _checkout(self, conn):
+        """Pings an idle connection, reconnecting it if the server dropped it.
+
+        Returns:
+            tuple: (connection, whether it had to reconnect)
+        """
+        try:
+            before = conn.thread_id()
+            conn.ping(reconnect=True)
+            return conn, conn.thread_id() != before
+        except pymysql.MySQLError:
+            try:
+                conn.close()
+            except pymysql.MySQLError:
+                pass
+            return self._connect(), True
+
+    def _free_slot(self, count=1):
+        with self._available:
+            self._opened -= count
+            self._available.notify(count)
+
+    def acquire(self, timeout=None):
+        """Checks out a live connection; pair with `release`, or use `connection()`."""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = start + timeout
+        waited = False
+        conn = None
+        with self._available:
+            # Take an idle connection, or else reserve a slot for a new one, or else wait for either
+            while not self._idle and self._opened >= self.size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No database connection free after {timeout:.1f}s (pool size {self.size})")
+                waited = True
+                self._available.wait(remaining)
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                self._opened += 1
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._free_slot()
+                raise
+            self._record(start, waited)
+            return conn
+        self._record(start, waited)
+
+        try:
+            conn, reconnected = self._checkout(conn)
+        except Exception:
+            self._free_slot()
+            raise
+        if reconnected:
+            with self._lock:
+                self.reconnects += 1
+        return conn
+
+    def _record(self, start, waited):
+        wait_ms = (time.perf_counter() - start) * 1000.0
+        self._local.wait_ms = wait_ms
+        with self._lock:
+            self.acquisitions += 1
+            if waited:
+                self.waits += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def last_wait_ms(self):
+        """Milliseconds the calling thread's most recent acquire waited for a connection."""
+        return getattr(self._local, "wait_ms", 0.0)
+
+    def release(self, conn, broken=False):
+        """Returns a connection to the pool; broken ones are closed and their slot freed.
+
+        Either way one waiting `acquire` is woken: it takes the connection,
+        or opens a new one in the freed slot.
+        """
+        if broken or self._closed or not conn.open:
+            try:
+                conn.close()
+            except pymysql.MySQLError:
+                pass
+            self._free_slot()
+            return
+        with self._available:
+            self._idle.append(conn)
+            self._available.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager around acquire/release.
+
+        A connection that raised a connection-level error is discarded
+        instead of being handed to the next caller.
+        """
+        conn = self.acquire(timeout=timeout)
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            self.release(conn, broken=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """Closes the idle connections; connections still checked out close on release."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            try:
+                conn.close()
+            except pymysql.MySQLError:
+                pass
+        self._free_slot(len(idle))
+
+    def stats(self):
+        """Returns pool occupancy and wait-time metrics."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._opened,
+                "idle": len(self._idle),
+                "in_use": self._opened - len(self._idle),
+                "acquisitions": self.acquisitions,
+                "waits": self.waits,
+                "wait_ms_avg": self.wait_ms_total / self.acquisitions if self.acquisitions else 0.0,
+                "wait_ms_max": self.wait_ms_max,
+                "timeouts": self.timeouts,
+                "reconnects": self.reconnects,
+            }
+
+
+class AsyncConnectionPool:
+    """asyncio counterpart of ConnectionPool, on top of aiomysql's pool.
+
+    Same settings, size, acquire timeout, autocommit and metrics as
+    ConnectionPool. aiomysql does not ping on checkout, so connections idle
+    for more than `recycle` seconds are reopened instead. The pool belongs
+    to the event loop it is first used in.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=ACQUIRE_TIMEOUT, recycle=POOL_RECYCLE, **settings):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.settings = dict(DB_SETTINGS, **settings)
+        self.settings.setdefault("autocommit", True)
+        self._pool = None
+        self._create_lock = asyncio.Lock()
+        self._wait_ms = contextvars.ContextVar("wait_ms", default=0.0)  # Per task, like the thread-local above
+
+        # Metrics
+        self.acquisitions = 0
+        self.waits = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.timeouts = 0
+
+    async def _aiomysql_pool(self):
+        if self._pool is None:
+            async with self._create_lock:
+                if self._pool is None:
+                    try:
+                        import aiomysql
+                    except ImportError as e:
+                        raise RuntimeError("The async database layer requires aiomysql (pip install aiomysql)") from e
+                    settings = dict(self.settings)
+                    settings["db"] = settings.pop("database")
+                    self._pool = await aiomysql.create_pool(minsize=0, maxsize=self.size,
+                                                            pool_recycle=self.recycle, **settings)
+        return self._pool
+
+    async def acquire(self, timeout=None):
+        """Checks out a connection; pair with `release`, or use `connection()`."""
+        timeout = self.timeout if timeout is None else timeout
+        pool = await self._aiomysql_pool()
+        start = time.perf_counter()
+        waited = pool.freesize == 0 and pool.size >= self.size
+        try:
+            conn = await asyncio.wait_for(pool.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolTimeout(f"No database connection free after {timeout:.1f}s (pool size {self.size})") from None
+
+        wait_ms = (time.perf_counter() - start) * 1000.0
+        self._wait_ms.set(wait_ms)
+        self.acquisitions += 1
+        self.waits += waited
+        self.wait_ms_total += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        return conn
+
+    def last_wait_ms(self):
+        """Milliseconds the current task's most recent acquire waited for a connection."""
+        return self._wait_ms.get()
+
+    async def release(self, conn, broken=False):
+        """Returns a connection to the pool; broken ones are closed and dropped."""
+        if broken:
+            conn.close()
+        await self._pool.release(conn)
+
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        """Async context manager around acquire/release; see ConnectionPool.connection."""
+        conn = await self.acquire(timeout=timeout)
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            await self.release(conn, broken=True)
+            raise
+        except BaseException:
+            await self.release(conn)
+            raise
+        else:
+            await self.release(conn)
+
+    async def close(self):
+        """Closes the pool, waiting for connections still checked out to come back."""
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+
+    def stats(self):
+        """Returns pool occupancy and wait-time metrics."""
+        pool = self._pool
+        opened = pool.size if pool is not None else 0
+        idle = pool.freesize if pool is not None else 0
+        return {
+            "size": self.size,
+            "open": opened,
+            "idle": idle,
+            "in_use": opened - idle,
+            "acquisitions": self.acquisitions,
+            "waits": self.waits,
+            "wait_ms_avg": self.wait_ms_total / self.acquisitions if self.acquisitions else 0.0,
+            "wait_ms_max": self.wait_ms_max,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,156 @@
+"""Exports the skin analysis model for the TFLite and ONNX Runtime backends.
+
+Usage (from the repository root):
+    python -m models.export --backend tflite --backend onnx --quantize --check
+
+Each export is written next to the Keras model under the file name listed in
+models/backends.py; `--quantize` additionally writes the "-int8" variant using
+post-training integer quantization calibrated on the face crops in
+static/uploads. Exported models take uint8 images and scale them to [0, 1]
+inside the graph, like the Keras backend. `--check` compares every exported
+model against the Keras outputs on the same samples.
+"""
+import argparse
+import glob
+import os
+
+import numpy as np
+import tensorflow as tf
+
+from models.backends import KerasBackend, load_backend, model_path_for
+from models.skin_analysis import HEAD_NAMES, MODEL_PATH, build_model, preprocess_image
+
+SAMPLE_GLOB = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "uploads", "*_face.jpg")
+
+
+def representative_samples(limit=64):
+    """Preprocessed face crops used for int8 calibration and parity checks."""
+    paths = sorted(glob.glob(SAMPLE_GLOB))[:limit]
+    if not paths:
+        print("WARNING: No sample faces found, falling back to random calibration data")
+        return np.random.default_rng(0).integers(0, 256, (8, 224, 224, 3), dtype=np.uint8)
+    return np.stack([preprocess_image(path) for path in paths])
+
+
+def with_uint8_input(model):
+    """Wraps the model so it takes uint8 images and rescales them in-graph."""
+    inputs = tf.keras.Input(shape=model.input_shape[1:], dtype="uint8", name="image")
+    scaled = tf.keras.layers.Rescaling(1.0 / 255)(inputs)  # Casts to float32 before scaling
+    outputs = [tf.keras.layers.Identity(name=name)(output) for name, output in zip(HEAD_NAMES, model(scaled))]
+    return tf.keras.Model(inputs, outputs)
+
+
+def export_tflite(model, output_path, quantize=False, samples=None):
+    """Converts the Keras model to a .tflite file.
+
+    With `quantize`, weights and activations are quantized to int8 using
+    `samples` for calibration. The uint8 input and float32 outputs are kept,
+    so the backend is a drop-in replacement.
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(with_uint8_input(model))
+    if quantize:
+        samples = representative_samples() if samples is None else samples
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([sample[np.newaxis]] for sample in samples)
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+            tf.lite.OpsSet.TFLITE_BUILTINS,  # Float fallback for ops without int8 kernels
+        ]
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"DEBUG: Wrote TFLite model to {output_path}")
+
+
+class _CalibrationReader:
+    """Feeds calibration samples one at a time to ONNX Runtime's quantizer."""
+
+    def __init__(self, input_name, samples):
+        self._batches = iter([{input_name: sample[np.newaxis]} for sample in samples])
+
+    def get_next(self):
+        return next(self._batches, None)
+
+
+def export_onnx(model, output_path, quantize=False, samples=None, opset=17):
+    """Converts the Keras model to a .onnx file with a dynamic batch dimension.
+
+    With `quantize`, the float model is statically quantized to int8 (QDQ
+    format) using `samples` for calibration.
+    """
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise RuntimeError("ONNX export requires tf2onnx (pip install tf2onnx onnxruntime)") from e
+
+    input_signature = (tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.uint8, name="image"),)
+    float_path = output_path + ".float" if quantize else output_path
+    tf2onnx.convert.from_keras(with_uint8_input(model), input_signature=input_signature, opset=opset,
+                               output_path=float_path)
+
+    if quantize:
+        from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+        class CalibrationReader(_CalibrationReader, CalibrationDataReader):
+            pass
+
+        samples = representative_samples() if samples is None else samples
+        quantize_static(
+            float_path, output_path, CalibrationReader("image", samples),
+            quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+        )
+        os.remove(float_path)
+    print(f"DEBUG: Wrote ONNX model to {output_path}")
+
+
+def check_parity(keras_model, runner, samples):
+    """Compares a backend runner against the Keras model on the same samples.
+
+    Returns:
+        dict: Per head, the max absolute probability difference and the
+              fraction of samples whose top-1 label agrees.
+    """
+    expected = KerasBackend(keras_model).predict(samples)
+    actual = runner.predict(samples)
+    report = {}
+    for name, want, got in zip(HEAD_NAMES, expected, actual):
+        report[name] = {
+            "max_abs_diff": float(np.max(np.abs(want - got))),
+            "top1_agreement": float(np.mean(np.argmax(want, axis=1) == np.argmax(got, axis=1))),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the skin analysis model to TFLite / ONNX")
+    parser.add_argument("--backend", action="append", choices=["tflite", "onnx"],
+                        help="Format to export (repeatable). Defaults to both.")
+    parser.add_argument("--quantize", action="store_true", help="Also write int8-quantized variants")
+    parser.add_argument("--check", action="store_true", help="Check parity against the Keras outputs")
+    args = parser.parse_args()
+
+    if os.path.exists(MODEL_PATH):
+        keras_model = tf.keras.models.load_model(MODEL_PATH)
+    else:
+        print(f"WARNING: {MODEL_PATH} not found, exporting an untrained model")
+        keras_model = build_model()
+    samples = representative_samples()
+
+    exporters = {"tflite": export_tflite, "onnx": export_onnx}
+    targets = []
+    for fmt in args.backend or ["tflite", "onnx"]:
+        exporters[fmt](keras_model, model_path_for(fmt), samples=samples)
+        targets.append(fmt)
+        if args.quantize:
+            exporters[fmt](keras_model, model_path_for(fmt + "-int8"), quantize=True, samples=samples)
+            targets.append(fmt + "-int8")
+
+    if args.check:
+        for backend in targets:
+            runner = load_backend(backend, model_path_for(backend), HEAD_NAMES)
+            for head, stats in check_parity(keras_model, runner, samples).items():
+                print(f"{backend:12s} {head:15s} max|diff|={stats['max_abs_diff']:.4f} "
+                      f"top1 agreement={stats['top1_agreement']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+# Detector backend used when none is passed explicitly: "haar", "res10" or "yunet"
+FACE_DETECTOR_BACKEND = os.environ.get("SKIN_FACE_DETECTOR", "haar")
+
+# OpenCV's bundled frontal face Haar cascade
+HAAR_CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+
+# Local files for the OpenCV DNN detectors (not shipped with the repo)
+FACE_MODEL_DIR = os.environ.get("SKIN_FACE_MODEL_DIR", os.path.join(os.path.dirname(__file__), "face_detector"))
+RES10_PROTOTXT = "deploy.prototxt"
+RES10_WEIGHTS = "res10_300x300_ssd_iter_140000.caffemodel"
+YUNET_MODEL = "face_detection_yunet_2023mar.onnx"
+
+# Detection parameters used by the Analyze page
+SCALE_FACTOR = 1.1
+MIN_NEIGHBORS = 5
+MIN_FACE_SIZE = (100, 100)  # In full-resolution pixels
+DNN_CONFIDENCE = 0.6
+
+# Large photos are searched on a copy whose longer side is about this many
+# pixels, but never shrunk so far that a MIN_FACE_SIZE face ends up narrower
+# than DETECTION_MIN_FACE_PIXELS (the cascade's own window is 24x24)
+DETECTION_MAX_SIDE = 1024
+DETECTION_MIN_FACE_PIXELS = 32
+
+# Longer side of the image YuNet runs on
+YUNET_MAX_SIDE = 640
+
+
+def _detection_scale(shape):
+    """Factor the image is shrunk by before the Haar search."""
+    return min(1.0, max(DETECTION_MAX_SIDE / float(max(shape[:2])),
+                        DETECTION_MIN_FACE_PIXELS / float(MIN_FACE_SIZE[0])))
+
+
+def _to_full_resolution(boxes, scale, shape):
+    """Maps (x, y, w, h) boxes found at `scale` back into the full image, largest first."""
+    height, width = shape[:2]
+    mapped = []
+    for x, y, w, h in boxes:
+        x, y = max(0, int(x / scale)), max(0, int(y / scale))
+        w, h = min(int(round(w / scale)), width - x), min(int(round(h / scale)), height - y)
+        if w > 0 and h > 0:
+            mapped.append((x, y, w, h))
+    return sorted(mapped, key=lambda f: f[2] * f[3], reverse=True)
+
+
+def _model_file(name):
+    path = os.path.join(FACE_MODEL_DIR, name)
+    if not os.path.exists(path):
+        raise RuntimeError(f"Face detector model file not found: {path}. Download it into {FACE_MODEL_DIR}.")
+    return path
+
+
+class HaarFaceDetector:
+    """OpenCV Haar cascade, searched on a downscaled grayscale copy."""
+
+    name = "haar"
+
+    def __init__(self):
+        self._cascade = cv2.CascadeClassifier(HAAR_CASCADE_PATH)
+        if self._cascade.empty():
+            raise RuntimeError(f"Could not load face cascade from {HAAR_CASCADE_PATH}")
+
+    def detect(self, image, downscale=True):
+        """With `downscale`, the search runs on a copy shrunk by a factor derived
+        from the image dimensions, with `minSize` scaled to match, so the same
+        MIN_FACE_SIZE faces are found as at full resolution.
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        scale = _detection_scale(gray.shape) if downscale else 1.0
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        min_size = tuple(max(1, int(round(v * scale))) for v in MIN_FACE_SIZE)
+
+        faces = self._cascade.detectMultiScale(
+            gray, scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS, minSize=min_size
+        )
+        return _to_full_resolution(faces, scale, image.shape)
+
+
+class Res10SSDFaceDetector:
+    """OpenCV DNN ResNet-10 SSD (Caffe), run on a 300x300 blob."""
+
+    name = "res10"
+
+    def __init__(self):
+        self._net = cv2.dnn.readNetFromCaffe(_model_file(RES10_PROTOTXT), _model_file(RES10_WEIGHTS))
+
+    def detect(self, image, downscale=True):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        height, width = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(
+            cv2.resize(image, (300, 300), interpolation=cv2.INTER_AREA), 1.0, (300, 300), (104.0, 177.0, 123.0)
+        )
+        self._net.setInput(blob)
+        detections = self._net.forward()[0, 0]
+
+        detections = detections[detections[:, 2] >= DNN_CONFIDENCE]
+        corners = detections[:, 3:7] * np.array([width, height, width, height])
+        boxes = [(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in corners]
+        return [box for box in _to_full_resolution(boxes, 1.0, image.shape) if max(box[2], box[3]) >= MIN_FACE_SIZE[0]]
+
+
+class YuNetFaceDetector:
+    """OpenCV FaceDetectorYN (YuNet ONNX model), run on a copy at most YUNET_MAX_SIDE wide."""
+
+    name = "yunet"
+
+    def __init__(self):
+        self._detector = cv2.FaceDetectorYN.create(_model_file(YUNET_MODEL), "", (320, 320), DNN_CONFIDENCE)
+
+    def detect(self, image, downscale=True):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        scale = min(1.0, YUNET_MAX_SIDE / float(max(image.shape[:2])))
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+        self._detector.setInputSize((small.shape[1], small.shape[0]))
+        _, faces = self._detector.detect(small)
+        if faces is None:
+            return []
+        boxes = _to_full_resolution(faces[:, :4], scale, image.shape)
+        return [box for box in boxes if max(box[2], box[3]) >= MIN_FACE_SIZE[0]]
+
+
+FACE_DETECTORS = {
+    "haar": HaarFaceDetector,
+    "res10": Res10SSDFaceDetector,
+    "yunet": YuNetFaceDetector,
+}
+
+# OpenCV detectors are not safe to share between threads, and Streamlit runs
+# every rerun on a new script thread, so loaded detectors live in a
+# process-wide pool per backend. A call checks one out for its duration; the
+# pool grows to the number of concurrent calls and never reloads a model.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+@contextmanager
+def face_detector(backend=None):
+    """Checks a detector for `backend` out of the pool, loading one if none is free.
+
+    Usage:
+        with face_detector("yunet") as detector:
+            faces = detector.detect(image)
+    """
+    backend = backend or FACE_DETECTOR_BACKEND
+    if backend not in FACE_DETECTORS:
+        raise ValueError(f"Unknown face detector '{backend}'. Options: {', '.join(FACE_DETECTORS)}")
+    with _pools_lock:
+        pool = _pools.setdefault(backend, queue.SimpleQueue())
+    try:
+        detector = pool.get_nowait()
+    except queue.Empty:
+        detector = FACE_DETECTORS[backend]()
+    try:
+        yield detector
+    finally:
+        pool.put(detector)
+
+
+def detect_faces(image, downscale=True, backend=None):
+    """Detects faces in a BGR or grayscale image.
+
+    Args:
+        image (np.ndarray): BGR or grayscale image.
+        downscale (bool): Search a downscaled copy of large photos (Haar only;
+                          the DNN detectors always run at their input size).
+        backend (str): Detector to use; defaults to SKIN_FACE_DETECTOR.
+
+    Returns:
+        list: (x, y, w, h) boxes in full-resolution pixels, largest first.
+    """
+    with face_detector(backend) as detector:
+        return detector.detect(image, downscale=downscale)
+
+
+def detect_largest_face(image, downscale=True, backend=None):
+    """Returns the full-resolution (x, y, w, h) box of the largest face, or None."""
+    faces = detect_faces(image, downscale=downscale, backend=backend)
+    return faces[0] if faces else None
+
+
+def crop_face(image, box):
+    """Returns the region of `image` inside an (x, y, w, h) box."""
+    x, y, w, h = box
+    return image[y:y+h, x:x+w]
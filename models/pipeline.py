@@ -0,0 +1,111 @@
+import io
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from models.color_analysis import estimate_skin_color
+from models.face_detection import crop_face, detect_largest_face
+from models.skin_analysis import analyze_skin
+
+
+# JPEG uploads are decoded at 1/2, 1/4 or 1/8 scale in the DCT domain as long
+# as the shorter side stays at least this long (0 = always decode at full size)
+DECODE_MIN_SIDE = int(os.environ.get("SKIN_DECODE_MIN_SIDE", 896))
+
+REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+def _decode_flag(data, min_side):
+    """Picks the smallest JPEG decode scale whose shorter side is still >= `min_side`.
+
+    Only the image header is read. Other formats are always decoded at full
+    size, since OpenCV would decode them fully and resize afterwards anyway.
+    """
+    if not min_side:
+        return cv2.IMREAD_COLOR
+    try:
+        with Image.open(io.BytesIO(data)) as header:
+            if header.format != "JPEG":
+                return cv2.IMREAD_COLOR
+            short_side = min(header.size)
+    except Exception:
+        return cv2.IMREAD_COLOR
+    for factor, flag in REDUCED_DECODE_FLAGS:
+        if short_side // factor >= min_side:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_image(data, min_side=None):
+    """Decodes uploaded image bytes into a BGR array.
+
+    Large JPEGs are decoded at a reduced scale (see DECODE_MIN_SIDE), which
+    is enough for face detection and the 224x224 model input and avoids
+    materializing the full-resolution photo.
+    """
+    if not data:
+        raise ValueError("Could not decode the uploaded image. Please upload a JPG or PNG file.")
+    flag = _decode_flag(data, DECODE_MIN_SIDE if min_side is None else min_side)
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+    if image is None:
+        raise ValueError("Could not decode the uploaded image. Please upload a JPG or PNG file.")
+    return image
+
+
+def extract_face(data, save_path=None, min_side=None):
+    """Decodes upload bytes and crops the largest face, all in memory.
+
+    Args:
+        data (bytes): Encoded image, e.g. `UploadedFile.getvalue()`.
+        save_path (str): If given, the face crop is also written there as a JPEG.
+        min_side (int): Shortest side to decode at; defaults to DECODE_MIN_SIDE.
+
+    Returns:
+        tuple: (image, face) as BGR arrays; face is None if no face was found.
+               Both are at the decoded (possibly reduced) resolution.
+    """
+    image = decode_image(data, min_side=min_side)
+    box = detect_largest_face(image)
+    if box is None:
+        return image, None
+
+    face = crop_face(image, box)
+    if save_path:
+        cv2.imwrite(save_path, face)
+    return image, face
+
+
+def analyze_face(face):
+    """Runs skin analysis on a BGR face crop without touching the disk.
+
+    Returns:
+        tuple: (skin_tone, skin_type, skin_concern, skin_texture, skin_undertone)
+    """
+    return analyze_skin(cv2.cvtColor(face, cv2.COLOR_BGR2RGB))
+
+
+def estimate_face_color(face):
+    """Model-free skin tone and undertone estimate for a BGR face crop.
+
+    Returns:
+        dict: See `models.color_analysis.estimate_skin_color`.
+    """
+    return estimate_skin_color(face)
+
+
+def analyze_upload(data, save_path=None):
+    """Decode, detect, crop and analyze upload bytes end to end.
+
+    Returns:
+        tuple: The analysis tuple from `analyze_face`, or None if no face was found.
+    """
+    _, face = extract_face(data, save_path=save_path)
+    if face is None:
+        return None
+    return analyze_face(face)
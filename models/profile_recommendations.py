@@ -0,0 +1,181 @@
+"""Materialized recommendations: a ranked product-id list for every skin profile.
+
+Every input the recommend functions can get from the model is enumerable, so
+this job evaluates each profile once against the catalog and stores the
+result, either as a local snapshot file or in the `profile_recommendations`
+MySQL table (see sql.sql), keyed by a packed profile code. Serving a
+recommendation is then one array slice or one primary-key range read.
+
+Usage (from the repository root), after populating the catalog:
+    python -m models.profile_recommendations --snapshot --table
+"""
+import argparse
+import os
+from itertools import product
+
+import numpy as np
+
+from models.skin_analysis import (
+    SKIN_CONCERN_LABELS, SKIN_TEXTURE_LABELS, SKIN_TONE_LABELS, SKIN_TYPE_LABELS, SKIN_UNDERTONE_LABELS
+)
+
+SNAPSHOT_PATH = os.environ.get(
+    "SKIN_PROFILE_SNAPSHOT", os.path.join(os.path.dirname(__file__), "profile_recommendations.npz")
+)
+
+# Mixed-radix digits of the profile code, most significant first. Undertone
+# digit 0 means "no undertone filter".
+CATEGORIES = ["Skincare", "Makeup"]
+PROFILE_DIGITS = [
+    ("category", CATEGORIES),
+    ("skin_tone", SKIN_TONE_LABELS),
+    ("skin_type", SKIN_TYPE_LABELS),
+    ("skin_concern", SKIN_CONCERN_LABELS),
+    ("skin_texture", SKIN_TEXTURE_LABELS),
+    ("undertone", [None] + SKIN_UNDERTONE_LABELS),
+]
+PROFILE_CODES = int(np.prod([len(values) for _, values in PROFILE_DIGITS]))
+
+_digit_lookup = [
+    {(value.lower() if value else None): digit for digit, value in enumerate(values)}
+    for _, values in PROFILE_DIGITS
+]
+
+
+def profile_code(category, skin_tone, skin_type, skin_concern, skin_texture, undertone=None):
+    """Packs a complete profile into an int, or returns None if it is not materialized.
+
+    Profiles with an empty or unknown attribute (other than undertone) are
+    not precomputed; callers fall back to filtering.
+    """
+    code = 0
+    values = (category, skin_tone, skin_type, skin_concern, skin_texture, undertone or None)
+    for (_, labels), lookup, value in zip(PROFILE_DIGITS, _digit_lookup, values):
+        digit = lookup.get(value.strip().lower() if value else None)
+        if digit is None:
+            return None
+        code = code * len(labels) + digit
+    return code
+
+
+def iter_profiles():
+    """Yields (code, filters) for every profile the recommend functions serve.
+
+    Skincare profiles never filter on undertone; makeup profiles come with
+    and without it.
+    """
+    for category in CATEGORIES:
+        undertones = [None] if category == "Skincare" else [None] + SKIN_UNDERTONE_LABELS
+        for tone, skin_type, concern, texture, undertone in product(
+            SKIN_TONE_LABELS, SKIN_TYPE_LABELS, SKIN_CONCERN_LABELS, SKIN_TEXTURE_LABELS, undertones
+        ):
+            filters = {"category": category, "skin_tone": tone, "skin_type": skin_type,
+                       "skin_concern": concern, "skin_texture": texture, "undertone": undertone}
+            yield profile_code(**filters), filters
+
+
+class MaterializedRecommendations:
+    """Ranked product ids per profile code, stored CSR-style.
+
+    `offsets` has PROFILE_CODES + 1 entries; the products of profile `code`
+    are `product_ids[offsets[code]:offsets[code + 1]]`, best first.
+    """
+
+    def __init__(self, offsets, product_ids, fingerprint=None):
+        self.offsets = offsets
+        self.product_ids = product_ids
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def compute(cls, index):
+        """Evaluates every profile against a CatalogIndex, ranking products by id."""
+        lists = {}
+        for code, filters in iter_profiles():
+            lists[code] = index.ids[index.match(**filters)]
+        counts = np.zeros(PROFILE_CODES, dtype=np.int64)
+        for code, ids in lists.items():
+            counts[code] = len(ids)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        product_ids = np.empty(offsets[-1], dtype=np.int32)
+        for code, ids in lists.items():
+            product_ids[offsets[code]:offsets[code + 1]] = ids
+        return cls(offsets, product_ids, index.fingerprint())
+
+    def lookup(self, code):
+        """Returns the ranked product ids of a profile code."""
+        return self.product_ids[self.offsets[code]:self.offsets[code + 1]]
+
+    def __len__(self):
+        return int(np.count_nonzero(np.diff(self.offsets)))
+
+    def save(self, path=SNAPSHOT_PATH):
+        """Writes the snapshot file atomically, so a running app never reads half of it."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, offsets=self.offsets, product_ids=self.product_ids,
+                     fingerprint=np.array(self.fingerprint or ""))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_PATH):
+        """Loads a snapshot file, or returns None if there is none."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if len(data["offsets"]) != PROFILE_CODES + 1:
+                print(f"DEBUG: Ignoring {path}: built for a different set of labels")
+                return None
+            return cls(data["offsets"], data["product_ids"], str(data["fingerprint"]) or None)
+
+    def write_table(self, connection, chunk_size=5000):
+        """Replaces the contents of the profile_recommendations table.
+
+        Rows go into a staging copy that is renamed over the live table in
+        one step, so readers never see it empty or half filled.
+        """
+        cursor = connection.cursor()
+        cursor.execute("DROP TABLE IF EXISTS profile_recommendations_new, profile_recommendations_old")
+        cursor.execute("CREATE TABLE profile_recommendations_new LIKE profile_recommendations")
+        insert_query = ("INSERT INTO profile_recommendations_new (profile_code, product_rank, product_id) "
+                        "VALUES (%s, %s, %s)")
+        rows = []
+        for code in range(PROFILE_CODES):
+            for rank, product_id in enumerate(self.lookup(code).tolist()):
+                rows.append((code, rank, product_id))
+                if len(rows) >= chunk_size:
+                    cursor.executemany(insert_query, rows)
+                    rows = []
+        if rows:
+            cursor.executemany(insert_query, rows)
+        connection.commit()
+        cursor.execute("RENAME TABLE profile_recommendations TO profile_recommendations_old, "
+                       "profile_recommendations_new TO profile_recommendations")
+        cursor.execute("DROP TABLE profile_recommendations_old")
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute recommendations for every skin profile")
+    parser.add_argument("--snapshot", action="store_true", help=f"Write the snapshot file ({SNAPSHOT_PATH})")
+    parser.add_argument("--table", action="store_true", help="Fill the profile_recommendations MySQL table")
+    args = parser.parse_args()
+    if not (args.snapshot or args.table):
+        parser.error("choose --snapshot, --table or both")
+
+    from models import recommender
+    from models.catalog_index import CatalogIndex
+
+    with recommender.db_connection() as connection:
+        materialized = MaterializedRecommendations.compute(CatalogIndex.from_connection(connection))
+        print(f"DEBUG: {len(materialized)} profiles, {len(materialized.product_ids)} ranked products")
+        if args.snapshot:
+            materialized.save()
+            print(f"DEBUG: Wrote {SNAPSHOT_PATH}")
+        if args.table:
+            materialized.write_table(connection)
+            recommender.bump_catalog_version(connection)  # Results cached from the old table are stale
+            print("DEBUG: Filled profile_recommendations")
+
+
+if __name__ == "__main__":
+    main()
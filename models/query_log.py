@@ -0,0 +1,219 @@
+"""Per-call timing for the recommender's reads, and a slow-query log.
+
+Every recommend/fetch call runs inside `timed_call`, which records its
+latency, the rows it returned, the time spent waiting for a pooled
+connection and where the answer came from (`source`: "index", "snapshot",
+"mysql", ...). Calls go to the "skin.recommender" logger at DEBUG level and
+into per-function counters (`query_stats`). Calls slower than
+SKIN_SLOW_QUERY_MS are also logged at WARNING level on
+"skin.recommender.slow", with their SQL and, if SKIN_SLOW_QUERY_EXPLAIN=1,
+the EXPLAIN plan of the slow query. Set SKIN_SLOW_QUERY_LOG to a file path
+to write the slow-query log there.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+import pymysql
+
+SLOW_QUERY_MS = float(os.environ.get("SKIN_SLOW_QUERY_MS", 200))
+EXPLAIN_SLOW_QUERIES = os.environ.get("SKIN_SLOW_QUERY_EXPLAIN", "0") == "1"
+SLOW_QUERY_LOG = os.environ.get("SKIN_SLOW_QUERY_LOG")
+RECENT_CALLS = int(os.environ.get("SKIN_QUERY_LOG_SIZE", 200))
+
+logger = logging.getLogger("skin.recommender")
+slow_logger = logging.getLogger("skin.recommender.slow")
+if SLOW_QUERY_LOG:
+    _handler = logging.FileHandler(SLOW_QUERY_LOG)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_logger.addHandler(_handler)
+
+_stats = {}
+_recent = deque(maxlen=RECENT_CALLS)
+_stats_lock = threading.Lock()
+
+
+def _one_line(query):
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def explain(connection, query, params=None):
+    """Returns the EXPLAIN rows of a query, or None if MySQL refuses to explain it."""
+    try:
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        cursor.execute("EXPLAIN " + query.strip(), params)
+        plan = cursor.fetchall()
+        cursor.close()
+        return plan
+    except pymysql.MySQLError as e:
+        slow_logger.warning("EXPLAIN failed: %s", e)
+        return None
+
+
+async def aexplain(connection, cursor_class, query, params=None):
+    """`explain` for an aiomysql connection."""
+    try:
+        async with connection.cursor(cursor_class) as cursor:
+            await cursor.execute("EXPLAIN " + query.strip(), params)
+            return await cursor.fetchall()
+    except pymysql.MySQLError as e:
+        slow_logger.warning("EXPLAIN failed: %s", e)
+        return None
+
+
+class QueryCall:
+    """Timing of one recommend/fetch call; see `timed_call`."""
+
+    def __init__(self, function):
+        self.function = function
+        self.source = "mysql"
+        self.rows = 0
+        self.pool_wait_ms = 0.0
+        self.query_ms = 0.0
+        self.latency_ms = 0.0
+        self.query = None
+        self.params = None
+        self.plan = None
+        self.error = None
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def connection(self, pool):
+        """Checks a connection out of `pool`, recording how long the checkout waited."""
+        with pool.connection() as conn:
+            self.pool_wait_ms += pool.last_wait_ms()
+            yield conn
+
+    def execute(self, cursor, query, params=None):
+        """Runs a query and fetches all of its rows, timing both.
+
+        The EXPLAIN plan is captured on the same connection when the query
+        took longer than SLOW_QUERY_MS and SKIN_SLOW_QUERY_EXPLAIN is set.
+        """
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        if self._executed(start, query, params, rows):
+            self.plan = explain(cursor.connection, query, params)
+        return rows
+
+    @asynccontextmanager
+    async def aconnection(self, pool):
+        """`connection` for an AsyncConnectionPool."""
+        async with pool.connection() as conn:
+            self.pool_wait_ms += pool.last_wait_ms()
+            yield conn
+
+    async def aexecute(self, cursor, query, params=None):
+        """`execute` for aiomysql cursors."""
+        start = time.perf_counter()
+        await cursor.execute(query, params)
+        rows = await cursor.fetchall()
+        if self._executed(start, query, params, rows):
+            self.plan = await aexplain(cursor.connection, type(cursor), query, params)
+        return rows
+
+    def _executed(self, start, query, params, rows):
+        """Records a finished query; returns whether its EXPLAIN plan should be captured."""
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        self.query_ms += elapsed_ms
+        self.query, self.params = query, params
+        self.rows = len(rows)
+        return EXPLAIN_SLOW_QUERIES and elapsed_ms >= SLOW_QUERY_MS
+
+    def record(self):
+        """Returns the call as a flat dict."""
+        return {
+            "function": self.function,
+            "source": self.source,
+            "rows": self.rows,
+            "latency_ms": round(self.latency_ms, 3),
+            "query_ms": round(self.query_ms, 3),
+            "pool_wait_ms": round(self.pool_wait_ms, 3),
+            "error": self.error,
+        }
+
+    def finish(self):
+        self.latency_ms = (time.perf_counter() - self._start) * 1000.0
+        record = self.record()
+        slow = self.latency_ms >= SLOW_QUERY_MS
+        with _stats_lock:
+            _recent.append(record)
+            entry = _stats.setdefault(self.function, {
+                "calls": 0, "rows": 0, "errors": 0, "slow": 0, "latency_ms_total": 0.0,
+                "latency_ms_max": 0.0, "query_ms_total": 0.0, "pool_wait_ms_total": 0.0, "sources": {},
+            })
+            entry["calls"] += 1
+            entry["rows"] += self.rows
+            entry["errors"] += self.error is not None
+            entry["slow"] += slow
+            entry["latency_ms_total"] += self.latency_ms
+            entry["latency_ms_max"] = max(entry["latency_ms_max"], self.latency_ms)
+            entry["query_ms_total"] += self.query_ms
+            entry["pool_wait_ms_total"] += self.pool_wait_ms
+            entry["sources"][self.source] = entry["sources"].get(self.source, 0) + 1
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(" ".join(f"{key}={value}" for key, value in record.items()))
+        if slow:
+            message = " ".join(f"{key}={value}" for key, value in record.items())
+            if self.query is not None:
+                message += f" sql={_one_line(self.query)!r} params={self.params!r}"
+            if self.plan is not None:
+                message += f" plan={self.plan!r}"
+            slow_logger.warning(message)
+
+
+@contextmanager
+def timed_call(function):
+    """Times a recommend/fetch call and records it when the block exits.
+
+    Usage:
+        with timed_call("recommend_skincare") as call:
+            with call.connection(pool) as connection:
+                products = call.execute(connection.cursor(), query, params)
+    """
+    call = QueryCall(function)
+    try:
+        yield call
+    except Exception as e:
+        call.error = type(e).__name__
+        raise
+    finally:
+        call.finish()
+
+
+def query_stats():
+    """Returns per-function call counts, rows, latency, pool wait and answer sources."""
+    with _stats_lock:
+        stats = {}
+        for function, entry in _stats.items():
+            calls = entry["calls"]
+            stats[function] = {
+                "calls": calls,
+                "rows_avg": entry["rows"] / calls,
+                "errors": entry["errors"],
+                "slow": entry["slow"],
+                "latency_ms_avg": entry["latency_ms_total"] / calls,
+                "latency_ms_max": entry["latency_ms_max"],
+                "query_ms_avg": entry["query_ms_total"] / calls,
+                "pool_wait_ms_avg": entry["pool_wait_ms_total"] / calls,
+                "sources": dict(entry["sources"]),
+            }
+        return stats
+
+
+def recent_queries():
+    """Returns the last SKIN_QUERY_LOG_SIZE call records, oldest first."""
+    with _stats_lock:
+        return list(_recent)
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _stats.clear()
+        _recent.clear()
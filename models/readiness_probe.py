@@ -0,0 +1,30 @@
+"""Exit-code readiness probe for deployment tooling.
+
+Start the app with SKIN_READINESS_FILE pointing at a writable path, then poll:
+    SKIN_READINESS_FILE=/tmp/skin_ready.json python -m models.readiness_probe
+
+Prints the app's latest readiness report and exits 0 once a warmed-up model
+is serving, 1 otherwise.
+"""
+import json
+import os
+import sys
+
+
+def main():
+    path = os.environ.get("SKIN_READINESS_FILE")
+    if not path:
+        print("SKIN_READINESS_FILE is not set")
+        return 1
+    try:
+        with open(path) as f:
+            report = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"No readiness report yet: {e}")
+        return 1
+    print(json.dumps(report))
+    return 0 if report.get("ready") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,109 +1,487 @@
+import os
+import threading
+import time
+
 import pymysql
 
-# Global database connection
-connection = None
+from models.cache import LRUCache
+from models.catalog_index import CatalogIndex
+from models.db_pool import ConnectionPool
+from models.profile_recommendations import MaterializedRecommendations, profile_code
+from models.query_log import logger, timed_call
+
+# Process-wide connection pool shared by every Streamlit session thread
+_pool = None
+_pool_lock = threading.Lock()
+
+# Serve recommendations from the in-memory catalog index instead of MySQL
+USE_CATALOG_INDEX = os.environ.get("SKIN_CATALOG_INDEX", "1") == "1"
+# (CatalogIndex, profile snapshot or None, catalog version it was loaded at)
+# once loaded. It is swapped in and retired as a whole, so readers take one
+# reference to it (see `_current_catalog`) and use only that
+_catalog = None
+_index_load_lock = threading.Lock()  # One catalog build at a time
+_index_loader = None  # Background load or reload thread
+_index_loader_lock = threading.Lock()
+
+# Read complete profiles from the precomputed profile_recommendations table
+# when querying MySQL (upgraded databases need database/migrate_v4.sql; fill it
+# with: python -m models.profile_recommendations --table)
+USE_PROFILE_TABLE = os.environ.get("SKIN_PROFILE_TABLE", "0") == "1"
+
+# Recommend results, cached per profile and catalog version
+RECOMMEND_CACHE_SIZE = int(os.environ.get("SKIN_RECOMMEND_CACHE_SIZE", 1024))
+RECOMMEND_CACHE_TTL = float(os.environ.get("SKIN_RECOMMEND_CACHE_TTL", 300))  # Seconds
+_recommend_cache = LRUCache(RECOMMEND_CACHE_SIZE, ttl=RECOMMEND_CACHE_TTL)
+
+# A background thread reads the catalog_version row this often (seconds), so
+# another process's catalog edit shows up within this interval
+CATALOG_VERSION_INTERVAL = float(os.environ.get("SKIN_CATALOG_VERSION_INTERVAL", 2))
+CATALOG_VERSION_BUMP = ("INSERT INTO catalog_version (id, version) VALUES (1, 1) "
+                        "ON DUPLICATE KEY UPDATE version = version + 1")
+_catalog_version = None
+_version_checked = None
+_version_lock = threading.Lock()
+_version_poller = None
+_version_poller_lock = threading.Lock()
+_version_wakeup = threading.Event()  # Set to read the version before the interval is up
+
+# Rows per page for the paginated recommend functions
+PAGE_SIZE = int(os.environ.get("SKIN_RECOMMEND_PAGE_SIZE", 12))
+
+# Columns each recommend function returns
+SKINCARE_COLUMNS = ["name", "category", "recommendation", "subcategory",
+                    "skin_tone", "skin_type", "skin_concern", "skin_texture"]
+MAKEUP_COLUMNS = ["name", "category", "makeup_recommendation", "subcategory",
+                  "skin_tone", "skin_type", "skin_concern", "skin_texture",
+                  "undertone", "shade", "finish"]
+PRODUCT_COLUMNS = ["name", "category", "recommendation", "makeup_recommendation", "subcategory",
+                   "skin_tone", "skin_type", "skin_concern", "skin_texture",
+                   "undertone", "shade", "finish"]
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use.
+
+    Size and acquire timeout come from SKIN_DB_POOL_SIZE and
+    SKIN_DB_POOL_TIMEOUT; connection settings from SKIN_DB_* (see models/db_pool.py).
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def db_connection():
+    """Context manager that checks a live connection out of the pool."""
+    return get_pool().connection()
+
+
+def db_pool_stats():
+    """Returns pool occupancy and wait-time metrics."""
+    return get_pool().stats()
+
 
 def init_db_connection():
-    """Initialize and keep database connection open."""
-    global connection
-    if not connection:
-        try:
-            connection = pymysql.connect(
-                host="localhost",
-                user="root",
-                password="",  # Default XAMPP password
-                database="cosmetics_db",
-                port=3306
-            )
+    """Create the connection pool and check that the database is reachable."""
+    try:
+        with db_connection():
             print("DEBUG: Database connection established successfully.")
-        except pymysql.MySQLError as e:
-            print(f"DEBUG: Error connecting to the database: {e}")
-            connection = None
+    except pymysql.MySQLError as e:
+        print(f"DEBUG: Error connecting to the database: {e}")
 
-def recommend_skincare(skin_tone, skin_type, skin_concern, skin_texture):
-    """Recommend skincare products based on skin attributes."""
+def load_catalog_index(force=False):
+    """Loads the product catalog into the in-memory index, once per process.
+
+    While the background loader is running, other callers do not build a
+    second index; they get the current one. `force` reloads a loaded index.
+
+    Returns:
+        CatalogIndex: The index, or None if it is disabled, still loading or
+                      could not be loaded (the recommend functions then query MySQL).
+    """
+    if not USE_CATALOG_INDEX:
+        return None
+    catalog = _catalog
+    if catalog is not None and not force:
+        return catalog[0]
+    loader = _index_loader
+    if not force and loader is not None and loader.is_alive() and loader is not threading.current_thread():
+        return None
+    with _index_load_lock:
+        # Another thread may have loaded it while this one waited
+        if force or _catalog is None:
+            _build_catalog_index()
+        catalog = _catalog
+    return catalog[0] if catalog is not None else None
+
+
+def _build_catalog_index():
+    """Loads the catalog and swaps the new index in; callers hold _index_load_lock."""
+    global _catalog
     try:
-        if connection is None:
-            init_db_connection()
+        version = _read_catalog_version()
+        with db_connection() as connection:
+            index = CatalogIndex.from_connection(connection)
+        # Precomputed per-profile lists are only valid for the catalog they were built on
+        materialized = MaterializedRecommendations.load()
+        if materialized is not None and materialized.fingerprint != index.fingerprint():
+            logger.warning("Ignoring the profile snapshot, it was built for a different catalog")
+            materialized = None
+        # Swapped in whole, so readers never see a partial index
+        _catalog = (index, materialized, version)
+        logger.info("Catalog index loaded: %s, profile snapshot: %s", index.stats(), materialized is not None)
+    except pymysql.MySQLError as e:
+        logger.warning("Could not load the catalog index, querying MySQL instead: %s", e)
+
+
+def start_catalog_index_loading():
+    """Loads the catalog index on a background thread, once per process.
+
+    Safe to call on every Streamlit rerun. Recommendations query MySQL until
+    the index is in; a failed load is retried on a later call.
+    """
+    _start_version_poller()
+    if USE_CATALOG_INDEX and _catalog is None:
+        _start_index_loader()
 
-        cursor = connection.cursor(pymysql.cursors.DictCursor)
 
-        # Debugging: Print received parameters
-        print(f"DEBUG: Searching for skincare with - Tone: {skin_tone}, Type: {skin_type}, Concern: {skin_concern}, Texture: {skin_texture}")
-
-        # Skincare-specific query
-        query = """
-        SELECT name, category, recommendation, subcategory,
-               skin_tone, skin_type, skin_concern, skin_texture
-        FROM products
-        WHERE LOWER(skin_tone) LIKE LOWER(%s)
-        AND LOWER(skin_type) LIKE LOWER(%s)
-        AND LOWER(skin_concern) LIKE LOWER(%s)
-        AND LOWER(skin_texture) LIKE LOWER(%s)
-        AND LOWER(category) = 'skincare'
+def _start_index_loader(force=False):
+    """Starts the background load unless one is already running."""
+    global _index_loader
+    with _index_loader_lock:
+        if _index_loader is None or not _index_loader.is_alive():
+            _index_loader = threading.Thread(target=load_catalog_index, kwargs={"force": force},
+                                             name="catalog-index-loader", daemon=True)
+            _index_loader.start()
+
+
+def refresh_catalog_index():
+    """Reloads the catalog index, e.g. after populate_db.py rewrote the products."""
+    return load_catalog_index(force=True)
+
+
+def _read_catalog_version():
+    """Reads the catalog_version counter; None on a database without the table."""
+    try:
+        with db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT version FROM catalog_version WHERE id = 1")
+            row = cursor.fetchone()
+            cursor.close()
+    except pymysql.err.ProgrammingError as e:
+        if _catalog_version is not None or _version_checked is None:
+            logger.warning("No catalog version, cached recommendations only expire by TTL: %s", e)
+        return None
+    return row[0] if row else 0
+
+
+def _current_catalog():
+    """Returns `_catalog` if it was loaded at the current catalog version, else None.
+
+    A recommendation is cached under the version its key was built with, so
+    an index older than that version must not answer it; MySQL does instead.
+    """
+    catalog = _catalog
+    if catalog is not None and catalog[2] == _catalog_version:
+        return catalog
+    return None
+
+
+def _start_version_poller():
+    """Starts the catalog version poller thread unless it is running."""
+    global _version_poller
+    if _version_poller is not None and _version_poller.is_alive():
+        return
+    with _version_poller_lock:
+        if _version_poller is None or not _version_poller.is_alive():
+            _version_poller = threading.Thread(target=_poll_catalog_version, name="catalog-version-poller",
+                                               daemon=True)
+            _version_poller.start()
+
+
+def _poll_catalog_version():
+    while True:
+        _version_wakeup.clear()
+        _check_catalog_version()
+        _version_wakeup.wait(CATALOG_VERSION_INTERVAL)
+
+
+def _check_catalog_version():
+    """Reads the catalog version from MySQL and applies a change.
+
+    A changed version retires an in-memory catalog index loaded at an older
+    version, starting a background reload, and then drops the cached
+    recommendations. A failed read keeps the last known version.
+    """
+    global _catalog_version, _version_checked, _catalog
+    with _version_lock:
+        try:
+            version = _read_catalog_version()
+        except pymysql.MySQLError as e:
+            logger.warning("Could not read the catalog version: %s", e)
+            return
+        catalog = _catalog
+        if catalog is not None and catalog[2] != version:
+            logger.info("Catalog changed (version %s -> %s), reloading the catalog index", catalog[2], version)
+            _catalog = None
+            _start_index_loader(force=True)
+        if version != _catalog_version:
+            _catalog_version = version
+            _recommend_cache.clear()
+        _version_checked = time.monotonic()
+
+
+def catalog_version(force=False):
+    """Returns the catalog version last read from MySQL.
+
+    The version is read by a background thread every CATALOG_VERSION_INTERVAL
+    seconds, so the request path never waits on MySQL for it, even while
+    the database is slow or down. `force` reads it now, on the calling thread.
+    """
+    if force:
+        _check_catalog_version()
+    else:
+        _start_version_poller()
+    return _catalog_version
+
+
+def bump_catalog_version(connection=None):
+    """Marks the catalog as changed, so every app process drops its cached recommendations.
+
+    Call it after any product edit. Pass the connection that made the edit
+    to bump in the same transaction (it takes effect when that commits);
+    without one the bump is committed at once. This process notices it on
+    its next version read, other processes within CATALOG_VERSION_INTERVAL seconds.
+    """
+    if connection is None:
+        with db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(CATALOG_VERSION_BUMP)
+            cursor.close()
+    else:
+        cursor = connection.cursor()
+        cursor.execute(CATALOG_VERSION_BUMP)
+        cursor.close()
+    _version_wakeup.set()
+
+
+def _cache_key(function, *args):
+    """Cache key of a recommend call; matching is case-insensitive, so the key is too."""
+    return (function, catalog_version()) + tuple(
+        arg.strip().lower() if isinstance(arg, str) else arg for arg in args
+    )
+
+
+def _cached(call, key, compute):
+    """Returns the cached result for `key`, or computes and caches it.
+
+    Entries live for RECOMMEND_CACHE_TTL seconds at most and are keyed by
+    catalog version, so a catalog edit is never answered from the cache.
+    Database errors propagate and are not cached.
+    """
+    result = _recommend_cache.get(key)
+    if result is None:
+        result = compute()
+        _recommend_cache.put(key, result)
+    else:
+        call.source = "cache"
+    return result
+
+
+def recommend_cache_stats():
+    """Returns size and hit/miss counters of the recommendation cache."""
+    return dict(_recommend_cache.stats(), catalog_version=_catalog_version)
+
+
+def clear_recommend_cache():
+    _recommend_cache.clear()
+
+
+def _recommend_in_memory(call, catalog, columns, **filters):
+    """Answers from the profile snapshot for complete profiles, else by bitmap filtering.
+
+    `catalog` is the caller's `_current_catalog()`; `_catalog` itself may be
+    replaced or retired by a reload at any moment.
+    """
+    index, materialized, _ = catalog
+    if materialized is not None:
+        code = profile_code(**filters)
+        if code is not None:
+            call.source = "snapshot"
+            return index.rows_by_id(materialized.lookup(code), columns)
+    call.source = "index"
+    return index.query(columns, **filters)
+
+
+# Concerns and textures live in junction tables (see sql.sql); these list a
+# product's values the way the old flat columns did
+CONCERNS_COLUMN = """(SELECT GROUP_CONCAT(sc.name ORDER BY sc.id SEPARATOR ', ')
+            FROM product_concerns pcs JOIN skin_concerns sc ON sc.id = pcs.concern_id
+            WHERE pcs.product_id = p.id) AS skin_concern"""
+TEXTURES_COLUMN = """(SELECT GROUP_CONCAT(st.name ORDER BY st.id SEPARATOR ', ')
+            FROM product_textures pts JOIN skin_textures st ON st.id = pts.texture_id
+            WHERE pts.product_id = p.id) AS skin_texture"""
+
+
+def _profile_filter(skin_tone, skin_type, skin_concern, skin_texture, category=None, undertone=None,
+                    after_id=None):
+    """Builds the JOIN/WHERE clauses that match products to a skin profile.
+
+    Every attribute is an equality match the indexes can seek on. As with the
+    old LIKE '%%' patterns, an empty attribute matches everything. With
+    `after_id`, only products with a larger id match (keyset pagination).
+
+    Returns:
+        tuple: (sql, params) to append after "FROM products p".
+    """
+    joins, conditions, params = [], [], []
+    if skin_concern:
+        joins.append("JOIN product_concerns pc ON pc.product_id = p.id "
+                     "JOIN skin_concerns c ON c.id = pc.concern_id AND c.name = %s")
+        params.append(skin_concern)
+    if skin_texture:
+        joins.append("JOIN product_textures pt ON pt.product_id = p.id "
+                     "JOIN skin_textures t ON t.id = pt.texture_id AND t.name = %s")
+        params.append(skin_texture)
+    for column, value in (("p.category", category), ("p.skin_tone", skin_tone),
+                          ("p.skin_type", skin_type), ("p.undertone", undertone)):
+        if value:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+    if after_id is not None:
+        conditions.append("p.id > %s")
+        params.append(after_id)
+
+    sql = "\n        ".join(joins)
+    if conditions:
+        sql += "\n        WHERE " + "\n        AND ".join(conditions)
+    return sql, params
+
+
+def _profile_source(call, skin_tone, skin_type, skin_concern, skin_texture, category=None, undertone=None):
+    """Returns the FROM ... clauses and params selecting a profile's products.
+
+    With USE_PROFILE_TABLE, a complete profile is a primary-key range read on
+    profile_recommendations; anything else filters products directly.
+    """
+    code = profile_code(category, skin_tone, skin_type, skin_concern, skin_texture, undertone) if USE_PROFILE_TABLE else None
+    if code is not None:
+        call.source = "profile_table"
+        return ("FROM profile_recommendations pr\n        JOIN products p ON p.id = pr.product_id"
+                "\n        WHERE pr.profile_code = %s\n        ORDER BY pr.product_rank"), [code]
+    filters, params = _profile_filter(skin_tone, skin_type, skin_concern, skin_texture,
+                                      category=category, undertone=undertone)
+    return "FROM products p\n        " + filters, params
+
+
+# Query text shared with models/async_recommender.py, so both layers read the same rows
+def _skincare_query(call, skin_tone, skin_type, skin_concern, skin_texture):
+    """Returns the (query, params) reading a profile's skincare products."""
+    source, params = _profile_source(call, skin_tone, skin_type, skin_concern, skin_texture, category="Skincare")
+    query = f"""
+        SELECT p.name, p.category, p.recommendation, p.subcategory,
+               p.skin_tone, p.skin_type, {CONCERNS_COLUMN}, {TEXTURES_COLUMN}
+        {source}
+        """
+    return query, params
+
+
+def _makeup_query(call, skin_tone, skin_type, skin_concern, skin_texture, undertone):
+    """Returns the (query, params) reading a profile's makeup products.
+
+    The undertone filter applies only if provided.
+    """
+    source, params = _profile_source(call, skin_tone, skin_type, skin_concern, skin_texture,
+                                     category="Makeup", undertone=undertone)
+    query = f"""
+        SELECT p.name, p.category, p.makeup_recommendation, p.subcategory,
+               p.skin_tone, p.skin_type, {CONCERNS_COLUMN}, {TEXTURES_COLUMN},
+               p.undertone, p.shade, p.finish
+        {source}
         """
-        
-        params = [f"%{skin_tone}%", f"%{skin_type}%", f"%{skin_concern}%", f"%{skin_texture}%"]
-            
-        # Debug: Print SQL query
-        print(f"DEBUG: Running Skincare Query -> {query}")
+    return query, params
+
 
-        cursor.execute(query, params)
-        products = cursor.fetchall()
+PRODUCT_DETAILS_QUERY = f"""
+    SELECT p.name, p.category, p.subcategory, p.image_path, p.link, p.recommendation, p.makeup_recommendation,
+           p.skin_tone, p.skin_type, {CONCERNS_COLUMN}, {TEXTURES_COLUMN}, p.undertone, p.shade, p.finish
+    FROM products p
+    WHERE p.name = %s
+    LIMIT 1;
+    """
 
-        # Debugging: Print SQL results
-        print(f"DEBUG: Skincare results: {products}")
+GALLERY_QUERY = """
+    SELECT name, category, subcategory, image_path, link FROM products
+    WHERE image_path IS NOT NULL
+    LIMIT %s;
+    """
 
+
+def _select_skincare(call, skin_tone, skin_type, skin_concern, skin_texture):
+    # Answered in memory, without a MySQL round trip, once the catalog index is loaded
+    catalog = _current_catalog()
+    if catalog is not None:
+        return _recommend_in_memory(call, catalog, SKINCARE_COLUMNS, category="Skincare", skin_tone=skin_tone,
+                                    skin_type=skin_type, skin_concern=skin_concern, skin_texture=skin_texture)
+
+    with call.connection(get_pool()) as connection:
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+
+        query, params = _skincare_query(call, skin_tone, skin_type, skin_concern, skin_texture)
+        products = call.execute(cursor, query, params)
         cursor.close()
         return products
 
+
+def recommend_skincare(skin_tone, skin_type, skin_concern, skin_texture):
+    """Recommend skincare products based on skin attributes.
+
+    Results are cached per profile (see `_cached`).
+    """
+    try:
+        with timed_call("recommend_skincare") as call:
+            key = _cache_key("recommend_skincare", skin_tone, skin_type, skin_concern, skin_texture)
+            products = _cached(call, key, lambda: _select_skincare(call, skin_tone, skin_type, skin_concern,
+                                                                   skin_texture))
+            call.rows = len(products)
+            return list(products)
+
     except pymysql.MySQLError as e:
         print(f"DEBUG: Database error: {e}")
         return []
 
-def recommend_makeup(skin_tone, skin_type, skin_concern, skin_texture, undertone):
-    """Recommend makeup products based on skin attributes and undertone."""
-    try:
-        if connection is None:
-            init_db_connection()
+def _select_makeup(call, skin_tone, skin_type, skin_concern, skin_texture, undertone):
+    # Answered in memory, without a MySQL round trip, once the catalog index is loaded
+    catalog = _current_catalog()
+    if catalog is not None:
+        return _recommend_in_memory(call, catalog, MAKEUP_COLUMNS, category="Makeup", skin_tone=skin_tone,
+                                    skin_type=skin_type, skin_concern=skin_concern,
+                                    skin_texture=skin_texture, undertone=undertone)
 
+    with call.connection(get_pool()) as connection:
         cursor = connection.cursor(pymysql.cursors.DictCursor)
 
-        # Debugging: Print received parameters
-        print(f"DEBUG: Searching for makeup with - Tone: {skin_tone}, Type: {skin_type}, Concern: {skin_concern}, Texture: {skin_texture}, Undertone: {undertone}")
-
-        # Makeup-specific query
-        query = """
-        SELECT name, category, makeup_recommendation, subcategory,
-               skin_tone, skin_type, skin_concern, skin_texture, 
-               undertone, shade, finish
-        FROM products
-        WHERE LOWER(skin_tone) LIKE LOWER(%s)
-        AND LOWER(skin_type) LIKE LOWER(%s)
-        AND LOWER(skin_concern) LIKE LOWER(%s)
-        AND LOWER(skin_texture) LIKE LOWER(%s)
-        AND LOWER(category) = 'makeup'
-        """
-        
-        params = [f"%{skin_tone}%", f"%{skin_type}%", f"%{skin_concern}%", f"%{skin_texture}%"]
-        
-        # Add undertone filter if provided
-        if undertone:
-            query += "AND LOWER(undertone) LIKE LOWER(%s) "
-            params.append(f"%{undertone}%")
-            
-        # Debug: Print SQL query
-        print(f"DEBUG: Running Makeup Query -> {query}")
-
-        cursor.execute(query, params)
-        products = cursor.fetchall()
-
-        # Debugging: Print SQL results
-        print(f"DEBUG: Makeup results: {products}")
-
+        query, params = _makeup_query(call, skin_tone, skin_type, skin_concern, skin_texture, undertone)
+        products = call.execute(cursor, query, params)
         cursor.close()
         return products
 
+
+def recommend_makeup(skin_tone, skin_type, skin_concern, skin_texture, undertone):
+    """Recommend makeup products based on skin attributes and undertone.
+
+    Results are cached per profile (see `_cached`).
+    """
+    try:
+        with timed_call("recommend_makeup") as call:
+            key = _cache_key("recommend_makeup", skin_tone, skin_type, skin_concern, skin_texture, undertone)
+            products = _cached(call, key, lambda: _select_makeup(call, skin_tone, skin_type, skin_concern,
+                                                                 skin_texture, undertone))
+            call.rows = len(products)
+            return list(products)
+
     except pymysql.MySQLError as e:
         print(f"DEBUG: Database error: {e}")
         return []
@@ -112,73 +490,216 @@ def recommend_makeup(skin_tone, skin_type, skin_concern, skin_texture, undertone
 def recommend_products(skin_tone, skin_type, skin_concern, skin_texture, category=None, undertone=None):
     """Recommend products based on multiple skin attributes."""
     try:
-        if connection is None:
-            init_db_connection()
-
-        cursor = connection.cursor(pymysql.cursors.DictCursor)  # Use DictCursor to return results as dictionaries
-
-        # Debugging: Print received parameters
-        print(f"DEBUG: Searching for products with - Tone: {skin_tone}, Type: {skin_type}, Concern: {skin_concern}, Texture: {skin_texture}, Category: {category}, Undertone: {undertone}")
-
-        # Base query - Include all skin attributes in the SELECT statement
-        query = """
-        SELECT name, category, recommendation, makeup_recommendation, subcategory,
-               skin_tone, skin_type, skin_concern, skin_texture, undertone, shade, finish
-        FROM products
-        WHERE LOWER(skin_tone) LIKE LOWER(%s)
-        AND LOWER(skin_type) LIKE LOWER(%s)
-        AND LOWER(skin_concern) LIKE LOWER(%s)
-        AND LOWER(skin_texture) LIKE LOWER(%s)
+        with timed_call("recommend_products") as call:
+            # Answered in memory, without a MySQL round trip, once the catalog index is loaded
+            catalog = _current_catalog()
+            if catalog is not None:
+                products = _recommend_in_memory(call, catalog, PRODUCT_COLUMNS, category=category,
+                                                skin_tone=skin_tone, skin_type=skin_type, skin_concern=skin_concern,
+                                                skin_texture=skin_texture, undertone=undertone)
+                call.rows = len(products)
+                return products
+
+            with call.connection(get_pool()) as connection:
+                # Use DictCursor to return results as dictionaries
+                cursor = connection.cursor(pymysql.cursors.DictCursor)
+
+                # Base query - Include all skin attributes in the SELECT statement.
+                # Category and undertone filters apply only if provided.
+                source, params = _profile_source(call, skin_tone, skin_type, skin_concern, skin_texture,
+                                                 category=category, undertone=undertone)
+                query = f"""
+                SELECT p.name, p.category, p.recommendation, p.makeup_recommendation, p.subcategory,
+                       p.skin_tone, p.skin_type, {CONCERNS_COLUMN}, {TEXTURES_COLUMN},
+                       p.undertone, p.shade, p.finish
+                {source}
+                """
+                products = call.execute(cursor, query, params)
+                cursor.close()
+                return products
+
+    except pymysql.MySQLError as e:
+        print(f"DEBUG: Database error: {e}")
+        return []
+
+def _fetch_page(function, columns, select_sql, after_id, limit, **filters):
+    """Fetches one keyset page of a profile's products, ordered by id.
+
+    Reads `limit + 1` rows through an unbuffered cursor, so memory per call
+    is bounded by the page size however many products match.
+
+    Returns:
+        tuple: (products, next_cursor); next_cursor is None on the last page.
+    """
+    after_id = after_id or 0
+    with timed_call(function) as call:
+        key = _cache_key(function, after_id, limit, *(filters[name] for name in sorted(filters)))
+        products, next_cursor = _cached(call, key, lambda: _select_page(call, columns, select_sql, after_id, limit,
+                                                                        **filters))
+        call.rows = len(products)
+        return list(products), next_cursor
+
+
+def _select_page(call, columns, select_sql, after_id, limit, **filters):
+    catalog = _current_catalog()
+    if catalog is not None:
+        call.source = "index"
+        return catalog[0].page(columns + ["id"], after_id, limit, **filters)
+
+    with call.connection(get_pool()) as connection:
+        cursor = connection.cursor(pymysql.cursors.SSDictCursor)
+        joins, params = _profile_filter(after_id=after_id, **filters)
+        query = f"""
+        SELECT p.id, {select_sql}
+        FROM products p
+        {joins}
+        ORDER BY p.id
+        LIMIT %s
         """
-        
-        # Add category filter if provided
-        params = [f"%{skin_tone}%", f"%{skin_type}%", f"%{skin_concern}%", f"%{skin_texture}%"]
-        if category:
-            query += "AND LOWER(category) = LOWER(%s) "
-            params.append(category)
-            
-        # Add undertone filter if provided
-        if undertone:
-            query += "AND LOWER(undertone) LIKE LOWER(%s) "
-            params.append(f"%{undertone}%")
-            
-        # Debug: Print SQL query correctly formatted
-        print(f"DEBUG: Running SQL Query -> {query}")
-
-        cursor.execute(query, params)
-        products = cursor.fetchall()
-
-        # Debugging: Print SQL results
-        print(f"DEBUG: Query results: {products}")
+        products = call.execute(cursor, query, params + [limit + 1])
+        cursor.close()
+
+    if len(products) > limit:
+        products = products[:limit]
+        return products, products[-1]["id"]
+    return products, None
+
+
+def recommend_makeup_page(skin_tone, skin_type, skin_concern, skin_texture, undertone, after_id=None, limit=PAGE_SIZE):
+    """One page of `recommend_makeup` results.
+
+    Args:
+        after_id (int): The `next_cursor` of the previous page; None for the first page.
+        limit (int): Products per page.
 
+    Returns:
+        tuple: (products, next_cursor); next_cursor is None on the last page.
+    """
+    try:
+        return _fetch_page("recommend_makeup_page", MAKEUP_COLUMNS,
+                           f"""p.name, p.category, p.makeup_recommendation, p.subcategory,
+               p.skin_tone, p.skin_type, {CONCERNS_COLUMN}, {TEXTURES_COLUMN},
+               p.undertone, p.shade, p.finish""", after_id, limit,
+                           category="Makeup", skin_tone=skin_tone, skin_type=skin_type,
+                           skin_concern=skin_concern, skin_texture=skin_texture, undertone=undertone)
+    except pymysql.MySQLError as e:
+        print(f"DEBUG: Database error: {e}")
+        return [], None
+
+
+def recommend_products_page(skin_tone, skin_type, skin_concern, skin_texture, category=None, undertone=None,
+                            after_id=None, limit=PAGE_SIZE):
+    """One page of `recommend_products` results. See `recommend_makeup_page`."""
+    try:
+        return _fetch_page("recommend_products_page", PRODUCT_COLUMNS,
+                           f"""p.name, p.category, p.recommendation, p.makeup_recommendation, p.subcategory,
+               p.skin_tone, p.skin_type, {CONCERNS_COLUMN}, {TEXTURES_COLUMN},
+               p.undertone, p.shade, p.finish""", after_id, limit,
+                           category=category, skin_tone=skin_tone, skin_type=skin_type,
+                           skin_concern=skin_concern, skin_texture=skin_texture, undertone=undertone)
+    except pymysql.MySQLError as e:
+        print(f"DEBUG: Database error: {e}")
+        return [], None
+
+
+def group_by_subcategory(products, groups=None):
+    """Appends products to per-subcategory lists in `groups`, keeping their order.
+
+    Products without a subcategory go under "Other".
+    """
+    groups = {} if groups is None else groups
+    for product in products:
+        groups.setdefault(product.get("subcategory") or "Other", []).append(product)
+    return groups
+
+
+def _select_all(call, skin_tone, skin_type, skin_concern, skin_texture, undertone, makeup_limit):
+    """Skincare products and the first makeup page of a profile in one statement.
+
+    Returns:
+        tuple: (skincare products, makeup products, makeup next_cursor)
+    """
+    catalog = _current_catalog()
+    if catalog is not None:
+        skincare = _recommend_in_memory(call, catalog, PRODUCT_COLUMNS + ["id"], category="Skincare",
+                                        skin_tone=skin_tone, skin_type=skin_type, skin_concern=skin_concern,
+                                        skin_texture=skin_texture)
+        makeup, next_cursor = catalog[0].page(PRODUCT_COLUMNS + ["id"], 0, makeup_limit, category="Makeup",
+                                              skin_tone=skin_tone, skin_type=skin_type, skin_concern=skin_concern,
+                                              skin_texture=skin_texture, undertone=undertone)
+        return skincare, makeup, next_cursor
+
+    # Both categories share the SELECT list, so they can come back as one
+    # UNION ALL result; the makeup branch reads one row past the page
+    select_sql = f"""SELECT p.id, p.name, p.category, p.recommendation, p.makeup_recommendation, p.subcategory,
+               p.skin_tone, p.skin_type, {CONCERNS_COLUMN}, {TEXTURES_COLUMN},
+               p.undertone, p.shade, p.finish
+        FROM products p"""
+    skincare_filter, skincare_params = _profile_filter(skin_tone, skin_type, skin_concern, skin_texture,
+                                                       category="Skincare")
+    makeup_filter, makeup_params = _profile_filter(skin_tone, skin_type, skin_concern, skin_texture,
+                                                   category="Makeup", undertone=undertone)
+    query = f"""
+        ({select_sql}
+        {skincare_filter})
+        UNION ALL
+        ({select_sql}
+        {makeup_filter}
+        ORDER BY p.id
+        LIMIT %s)
+        """
+    with call.connection(get_pool()) as connection:
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        rows = call.execute(cursor, query, skincare_params + makeup_params + [makeup_limit + 1])
         cursor.close()
-        return products
+
+    skincare = [row for row in rows if row["category"] == "Skincare"]
+    # A UNION ALL member's ORDER BY does not order the combined result, and the
+    # keyset cursor must be the largest id of the page
+    makeup = sorted((row for row in rows if row["category"] == "Makeup"), key=lambda row: row["id"])
+    if len(makeup) > makeup_limit:
+        makeup = makeup[:makeup_limit]
+        return skincare, makeup, makeup[-1]["id"]
+    return skincare, makeup, None
+
+
+def recommend_all(profile, makeup_limit=PAGE_SIZE):
+    """Skincare and makeup recommendations for one analysis, in a single MySQL round trip.
+
+    Args:
+        profile (tuple): (skin_tone, skin_type, skin_concern, skin_texture, undertone).
+        makeup_limit (int): Makeup products in the first page; fetch the
+                            following pages with `recommend_makeup_page`.
+
+    Returns:
+        dict: "skincare": list of products; "makeup": first page of makeup
+              products by subcategory (see `group_by_subcategory`);
+              "makeup_cursor": next_cursor of that page, None if it is the last.
+    """
+    skin_tone, skin_type, skin_concern, skin_texture, undertone = profile
+    try:
+        with timed_call("recommend_all") as call:
+            key = _cache_key("recommend_all", makeup_limit, *profile)
+            skincare, makeup, next_cursor = _cached(call, key, lambda: _select_all(
+                call, skin_tone, skin_type, skin_concern, skin_texture, undertone, makeup_limit))
+            call.rows = len(skincare) + len(makeup)
+            return {"skincare": list(skincare), "makeup": group_by_subcategory(makeup), "makeup_cursor": next_cursor}
 
     except pymysql.MySQLError as e:
         print(f"DEBUG: Database error: {e}")
-        return []
+        return {"skincare": [], "makeup": {}, "makeup_cursor": None}
+
 
 def fetch_product_details(product_name):
     """Fetch details of a specific product by name."""
     try:
-        if connection is None:
-            init_db_connection()
-
-        cursor = connection.cursor(pymysql.cursors.DictCursor)  # Use DictCursor
-
-        # SQL query to fetch product details
-        query = """
-        SELECT name, category, subcategory, image_path, link, recommendation, makeup_recommendation,
-               skin_tone, skin_type, skin_concern, skin_texture, undertone, shade, finish
-        FROM products 
-        WHERE name = %s
-        LIMIT 1;
-        """
-        cursor.execute(query, (product_name,))
-        product = cursor.fetchone()
+        with timed_call("fetch_product_details") as call, call.connection(get_pool()) as connection:
+            cursor = connection.cursor(pymysql.cursors.DictCursor)  # Use DictCursor
 
-        cursor.close()
-        return product
+            rows = call.execute(cursor, PRODUCT_DETAILS_QUERY, (product_name,))
+
+            cursor.close()
+            return rows[0] if rows else None
 
     except pymysql.MySQLError as e:
         print(f"DEBUG: Database error: {e}")
@@ -187,25 +708,13 @@ def fetch_product_details(product_name):
 def fetch_gallery_products(limit=20):
     """Fetch product details including images for the gallery."""
     try:
-        if connection is None:
-            init_db_connection()
+        with timed_call("fetch_gallery_products") as call, call.connection(get_pool()) as connection:
+            cursor = connection.cursor(pymysql.cursors.DictCursor)  # Use DictCursor
 
-        cursor = connection.cursor(pymysql.cursors.DictCursor)  # Use DictCursor
+            products = call.execute(cursor, GALLERY_QUERY, (limit,))
 
-        # SQL query to fetch product name, category, image path, and link
-        query = """
-        SELECT name, category, subcategory, image_path, link FROM products 
-        WHERE image_path IS NOT NULL 
-        LIMIT %s;
-        """
-        cursor.execute(query, (limit,))
-        products = cursor.fetchall()
-
-        # Debugging: Print fetched product count
-        print(f"DEBUG: Gallery Products Fetched: {len(products)} items")
-
-        cursor.close()
-        return products
+            cursor.close()
+            return products
 
     except pymysql.MySQLError as e:
         print(f"DEBUG: Database error: {e}")
@@ -213,8 +722,7 @@ def fetch_gallery_products(limit=20):
 
 
 def close_db_connection():
-    """Close database connection on app exit."""
-    global connection
-    if connection:
-        connection.close()
+    """Close the pooled database connections on app exit."""
+    if _pool is not None:
+        _pool.close()
         print("DEBUG: Database connection closed successfully.")
@@ -1,13 +1,21 @@
-import tensorflow as tf
 import numpy as np
 import os
+import hashlib
+import json
+import threading
+import time
+import cv2
 from PIL import Image
-import streamlit as st
 
-# Configure TensorFlow (Ensure GPU Memory Growth)
-physical_devices = tf.config.list_physical_devices('GPU')
-if physical_devices:
-    tf.config.experimental.set_memory_growth(physical_devices[0], True)
+from models.backends import (
+    DEFAULT_BACKEND, INTRA_OP_THREADS, TENSORFLOW_BACKENDS, KerasBackend, configure_tensorflow, load_backend,
+    model_path_for,
+)
+from models.batcher import MAX_BATCH_SIZE, PREDICT_TIMEOUT, MicroBatcher
+from models.cache import LRUCache
+from models.cascade import (
+    CASCADE_FAST_BACKEND, CASCADE_FAST_MODEL, CASCADE_MARGIN, FAST_KERAS_BASE, FAST_KERAS_MODEL, CascadePredictor
+)
 
 # Define Class Labels
 SKIN_TONE_LABELS = ["Fair", "Medium", "Dark"]
@@ -30,165 +38,586 @@ SKIN_TEXTURE_LABELS = [
 # Add makeup-specific undertone detection
 SKIN_UNDERTONE_LABELS = ["Cool", "Neutral", "Warm"]
 
-# Load Pre-trained Model (Modified for Multi-Output)
-# Initialize model variable globally
-model = None  
+# Output heads of the multi-output model, in output order
+HEAD_NAMES = ["skin_tone", "skin_type", "skin_concern", "skin_texture", "skin_undertone"]
+
+# Preprocessing applied to every face crop before inference
+INPUT_SIZE = (224, 224)
+CONTRAST_FACTOR = 1.2  # Slightly increase contrast
+BRIGHTNESS_DELTA = 0.1 * 255  # Slightly increase brightness
+
+# Batch sizes run through a freshly loaded model before it serves requests.
+# Defaults to every size the micro-batcher can form.
+WARMUP_BATCH_SIZES = [
+    int(size) for size in os.environ.get("SKIN_WARMUP_BATCH_SIZES", "").split(",") if size.strip()
+] or list(range(1, MAX_BATCH_SIZE + 1))
+
+# Optional file the readiness report is written to, for deployment probes
+READINESS_FILE = os.environ.get("SKIN_READINESS_FILE")
+
+# Path of the trained multi-output model
+MODEL_PATH = model_path_for("keras")
+
+
+def build_model(model_name="EfficientNetB0"):
+    """Builds a fresh multi-output skin analysis model on a pretrained base.
 
-def load_model(model_name="EfficientNetB0"):
-    """Loads the model only once and keeps it in memory.
-    
     Args:
         model_name (str): Name of the pretrained model to use as base.
-                          Options: "EfficientNetB0", "EfficientNetB3", "MobileNetV2", 
+                          Options: "EfficientNetB0", "EfficientNetB3", "MobileNetV2",
                           "ResNet50V2", "DenseNet121", "NASNetMobile", "Xception"
     """
-    global model  # Ensure we use a single instance
-
-    if model is None:  # Load only if not already loaded
-        print(f"DEBUG: Loading the skin analysis model with {model_name} base...")
-        
-        # Check if we have a pre-trained model file
-        model_path = os.path.join(os.path.dirname(__file__), "est_fitzpatrick_skin_tone_model.keras")
-        
-        if os.path.exists(model_path):
-            print(f"DEBUG: Loading pre-trained model from {model_path}")
-            model = tf.keras.models.load_model(model_path)
-            return model
-            
-        # If no pre-trained model exists, create a new one with the specified base model
-        # Select base model according to parameter
-        if model_name == "EfficientNetB0":
-            base_model = tf.keras.applications.EfficientNetB0(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
-        elif model_name == "EfficientNetB3":
-            base_model = tf.keras.applications.EfficientNetB3(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
-        elif model_name == "MobileNetV2":
-            base_model = tf.keras.applications.MobileNetV2(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
-        elif model_name == "ResNet50V2":
-            base_model = tf.keras.applications.ResNet50V2(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
-        elif model_name == "DenseNet121":
-            base_model = tf.keras.applications.DenseNet121(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
-        elif model_name == "NASNetMobile":
-            base_model = tf.keras.applications.NASNetMobile(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
-        elif model_name == "Xception":
-            base_model = tf.keras.applications.Xception(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
-        else:
-            print(f"WARNING: Unknown model name '{model_name}', defaulting to EfficientNetB0")
-            base_model = tf.keras.applications.EfficientNetB0(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
-        
-        # Fine-tune the top layers of the base model
-        base_model.trainable = True
-        for layer in base_model.layers[:-20]:  # Freeze all but the last 20 layers
-            layer.trainable = False
-
-        # Add Global Pooling Layer
-        x = tf.keras.layers.GlobalAveragePooling2D()(base_model.output)
-        
-        # Improve feature extraction with more complex layers
-        x = tf.keras.layers.Dense(1024, activation='relu')(x)
-        x = tf.keras.layers.BatchNormalization()(x)
-        x = tf.keras.layers.Dropout(0.4)(x)  # Increased dropout for better generalization
-        x = tf.keras.layers.Dense(512, activation='relu')(x)
-        x = tf.keras.layers.BatchNormalization()(x)
-        x = tf.keras.layers.Dropout(0.3)(x)
-
-        # Define Outputs
-        skin_tone_output = tf.keras.layers.Dense(len(SKIN_TONE_LABELS), activation='softmax', name="skin_tone")(x)
-        skin_type_output = tf.keras.layers.Dense(len(SKIN_TYPE_LABELS), activation='softmax', name="skin_type")(x)
-        skin_concern_output = tf.keras.layers.Dense(len(SKIN_CONCERN_LABELS), activation='softmax', name="skin_concern")(x)
-        skin_texture_output = tf.keras.layers.Dense(len(SKIN_TEXTURE_LABELS), activation='softmax', name="skin_texture")(x)
-        skin_undertone_output = tf.keras.layers.Dense(len(SKIN_UNDERTONE_LABELS), activation='softmax', name="skin_undertone")(x)
-
-        # Build Model with Multiple Outputs
-        model = tf.keras.Model(inputs=base_model.input, 
-                              outputs=[skin_tone_output, skin_type_output, skin_concern_output, 
-                                      skin_texture_output, skin_undertone_output])
-
-    return model  # Always return the same instance
-
-# Load the model once to avoid reloading issues
-model = load_model()
-
-# Add this import at the top
-import streamlit as st
-
-# Modify the analyze_skin function (around line 90)
-def analyze_skin(image_path, force_refresh=True):
-    """Analyzes skin tone, type, texture, concerns, and undertone from an image file.
+    import tensorflow as tf  # Imported on first use to keep app startup fast
+
+    # Select base model according to parameter
+    if model_name == "EfficientNetB0":
+        base_model = tf.keras.applications.EfficientNetB0(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
+    elif model_name == "EfficientNetB3":
+        base_model = tf.keras.applications.EfficientNetB3(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
+    elif model_name == "MobileNetV2":
+        base_model = tf.keras.applications.MobileNetV2(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
+    elif model_name == "ResNet50V2":
+        base_model = tf.keras.applications.ResNet50V2(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
+    elif model_name == "DenseNet121":
+        base_model = tf.keras.applications.DenseNet121(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
+    elif model_name == "NASNetMobile":
+        base_model = tf.keras.applications.NASNetMobile(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
+    elif model_name == "Xception":
+        base_model = tf.keras.applications.Xception(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
+    else:
+        print(f"WARNING: Unknown model name '{model_name}', defaulting to EfficientNetB0")
+        base_model = tf.keras.applications.EfficientNetB0(weights="imagenet", include_top=False, input_shape=(224, 224, 3))
+
+    # Fine-tune the top layers of the base model
+    base_model.trainable = True
+    for layer in base_model.layers[:-20]:  # Freeze all but the last 20 layers
+        layer.trainable = False
+
+    # Add Global Pooling Layer
+    x = tf.keras.layers.GlobalAveragePooling2D()(base_model.output)
+
+    # Improve feature extraction with more complex layers
+    x = tf.keras.layers.Dense(1024, activation='relu')(x)
+    x = tf.keras.layers.BatchNormalization()(x)
+    x = tf.keras.layers.Dropout(0.4)(x)  # Increased dropout for better generalization
+    x = tf.keras.layers.Dense(512, activation='relu')(x)
+    x = tf.keras.layers.BatchNormalization()(x)
+    x = tf.keras.layers.Dropout(0.3)(x)
+
+    # Define Outputs
+    skin_tone_output = tf.keras.layers.Dense(len(SKIN_TONE_LABELS), activation='softmax', name="skin_tone")(x)
+    skin_type_output = tf.keras.layers.Dense(len(SKIN_TYPE_LABELS), activation='softmax', name="skin_type")(x)
+    skin_concern_output = tf.keras.layers.Dense(len(SKIN_CONCERN_LABELS), activation='softmax', name="skin_concern")(x)
+    skin_texture_output = tf.keras.layers.Dense(len(SKIN_TEXTURE_LABELS), activation='softmax', name="skin_texture")(x)
+    skin_undertone_output = tf.keras.layers.Dense(len(SKIN_UNDERTONE_LABELS), activation='softmax', name="skin_undertone")(x)
+
+    # Build Model with Multiple Outputs
+    return tf.keras.Model(inputs=base_model.input,
+                          outputs=[skin_tone_output, skin_type_output, skin_concern_output,
+                                   skin_texture_output, skin_undertone_output])
+
+
+class SkinAnalysisEngine:
+    """Long-lived owner of the skin analysis model.
+
+    The model is loaded once per process and shared by every Streamlit session.
+    Requests read the current model through `snapshot()`, so a reload builds the
+    new model on the side and swaps it in atomically instead of clearing the
+    session out from under a running prediction. `version` increases by one on
+    every (re)load.
+
+    `backend` selects the runtime: "keras" (float32 TensorFlow), or an exported
+    "tflite", "tflite-int8", "onnx" or "onnx-int8" model (see models/export.py).
+    `model` holds the backend runner, which exposes `predict(batch)`. With no
+    model file, a "keras" engine builds an untrained model unless
+    `build_if_missing` is False, in which case loading raises like the other
+    backends.
+
+    Every (re)loaded model is warmed up with dummy batches of each size in
+    `warmup_batch_sizes` before it is swapped in, so graph tracing and buffer
+    allocation never land on a user request. `warm_latency_ms` records the
+    latency of a warm call per batch size.
+    """
+
+    def __init__(self, model_path=None, model_name="EfficientNetB0", backend=DEFAULT_BACKEND,
+                 warmup_batch_sizes=None, build_if_missing=True):
+        if backend in TENSORFLOW_BACKENDS:
+            configure_tensorflow()
+        self.backend = backend
+        self.model_path = model_path or model_path_for(backend)
+        self.model_name = model_name
+        self.build_if_missing = build_if_missing
+        self.model = None
+        self.version = 0
+        self.warmup_batch_sizes = WARMUP_BATCH_SIZES if warmup_batch_sizes is None else warmup_batch_sizes
+        self.warm_latency_ms = {}
+        self._file_signature = None
+        self._lock = threading.Lock()          # guards model/version swaps
+        self._reload_lock = threading.Lock()   # serializes (re)loads
+
+    def _read_file_signature(self):
+        """Returns (mtime, size) of the model file, or None if there is no file."""
+        try:
+            stat = os.stat(self.model_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load_from_disk(self, signature):
+        if signature is not None:
+            print(f"DEBUG: Loading pre-trained model from {self.model_path} ({self.backend} backend)")
+            return load_backend(self.backend, self.model_path, HEAD_NAMES, num_threads=INTRA_OP_THREADS or None)
+        if self.backend != "keras":
+            raise ValueError(f"No {self.backend} model at {self.model_path}. Export it with: python -m models.export --backend {self.backend}")
+        if not self.build_if_missing:
+            raise ValueError(f"No trained {self.model_name} model at {self.model_path}")
+        print(f"DEBUG: No model file found, building the skin analysis model with {self.model_name} base...")
+        return KerasBackend(build_model(self.model_name))
+
+    def _warm_up(self, runner):
+        """Runs dummy batches through a runner; returns warm latency (ms) per batch size."""
+        latencies = {}
+        for size in self.warmup_batch_sizes:
+            batch = np.zeros((size,) + INPUT_SIZE + (3,), dtype=np.uint8)
+            runner.predict(batch)  # Pays tracing and allocation
+            start = time.perf_counter()
+            runner.predict(batch)
+            latencies[size] = (time.perf_counter() - start) * 1000.0
+        return latencies
+
+    def _swap(self, new_model, signature):
+        latencies = self._warm_up(new_model)
+        with self._lock:
+            self.model = new_model
+            self._file_signature = signature
+            self.warm_latency_ms = latencies
+            self.version += 1
+        print(f"DEBUG: Skin analysis model ready (version {self.version}), warm latency ms: {latencies}")
+
+    def load(self):
+        """Loads the model if it is not loaded yet and returns it."""
+        if self.model is not None:
+            return self.model
+        with self._reload_lock:
+            if self.model is None:
+                signature = self._read_file_signature()
+                self._swap(self._load_from_disk(signature), signature)
+        return self.model
+
+    def reload_if_changed(self):
+        """Reloads the model only if the model file changed since the last load.
+
+        A loaded model stays in service while its file is missing.
+
+        Returns:
+            bool: True if a new model version was loaded.
+        """
+        if self.model is None:
+            self.load()
+            return True
+        # A missing file (removed, or mid-replace by a deploy) keeps the loaded
+        # model rather than building an untrained one in its place
+        if self._read_file_signature() in (self._file_signature, None):
+            return False
+        with self._reload_lock:
+            signature = self._read_file_signature()
+            if signature in (self._file_signature, None):
+                return False  # Another thread already reloaded it, or the file is gone again
+            self._swap(self._load_from_disk(signature), signature)
+        return True
+
+    def snapshot(self):
+        """Returns the (model, version) pair currently being served."""
+        with self._lock:
+            return self.model, self.version
+
+    def predict(self, batch):
+        """Runs the model on a preprocessed batch and returns one array per output head."""
+        model, _ = self.snapshot()
+        if model is None:
+            model = self.load()
+        return model.predict(batch)
+
+
+# Process-wide engine shared by every session
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(backend=None):
+    """Returns the process-wide skin analysis engine, creating it on first use.
+
+    Passing a `backend` other than the one being served replaces the engine;
+    requests already running finish on the previous one.
+    """
+    global _engine
+    if _engine is None or (backend is not None and backend != _engine.backend):
+        with _engine_lock:
+            if _engine is None or (backend is not None and backend != _engine.backend):
+                _engine = SkinAnalysisEngine(backend=backend or DEFAULT_BACKEND)
+    return _engine
+
+
+def load_model(model_name="EfficientNetB0", backend=None):
+    """Loads the model only once and keeps it in memory.
 
     Args:
-        image_path (str): Path to the image file.
-        force_refresh (bool): If True, reloads the model for fresh analysis.
+        model_name (str): Name of the pretrained model to use as base when no
+                          trained model file is present. See `build_model`.
+        backend (str): Inference backend to serve with ("keras", "tflite",
+                       "tflite-int8", "onnx", "onnx-int8"). Defaults to the
+                       SKIN_MODEL_BACKEND environment variable, else "keras".
 
     Returns:
-        tuple: (skin_tone, skin_type, skin_concern, skin_texture, skin_undertone)
+        The backend runner; `predict(batch)` returns one array per output head.
+    """
+    engine = get_engine(backend)
+    engine.model_name = model_name
+    return engine.load()  # Always return the same instance
+
+
+def reload_model():
+    """Reloads the model if its file changed on disk. Returns True if it did.
+
+    A cascade fast tier that failed to load is tried again on the next batch.
+    """
+    global _cascade_error
+    _cascade_error = None
+    reloaded = get_engine().reload_if_changed()
+    if reloaded:
+        _publish_readiness()
+    return reloaded
+
+
+# Optional fast-model-first cascade in front of the engine (SKIN_CASCADE_FAST_BACKEND)
+_cascade = None
+_cascade_lock = threading.Lock()
+_cascade_error = None  # Why the fast tier failed to load; the full engine then serves alone
+
+
+class _EngineProxy:
+    """Forwards to whichever engine get_engine() currently returns."""
+
+    def predict(self, batch):
+        return get_engine().predict(batch)
+
+
+def get_cascade():
+    """Returns the process-wide confidence cascade, or None if it is disabled.
+
+    The fast tier is its own engine on SKIN_CASCADE_FAST_BACKEND; the full
+    tier is the main engine, looked up per batch like everywhere else.
+    """
+    global _cascade
+    if not CASCADE_FAST_BACKEND:
+        return None
+    if _cascade is None:
+        with _cascade_lock:
+            if _cascade is None:
+                if CASCADE_FAST_BACKEND == "keras":
+                    # An untrained fast tier would answer confidently with random heads
+                    fast = SkinAnalysisEngine(model_path=CASCADE_FAST_MODEL or FAST_KERAS_MODEL,
+                                              model_name=FAST_KERAS_BASE, backend="keras", build_if_missing=False)
+                else:
+                    fast = SkinAnalysisEngine(model_path=CASCADE_FAST_MODEL or None, backend=CASCADE_FAST_BACKEND)
+                _cascade = CascadePredictor(fast, _EngineProxy(), margin=CASCADE_MARGIN)
+    return _cascade
+
+
+def _fast_tier_ready(cascade):
+    """Loads the cascade's fast tier if needed; False if it cannot be loaded."""
+    global _cascade_error
+    if cascade.fast.model is not None:
+        return True
+    if _cascade_error is not None:
+        return False
+    try:
+        cascade.fast.load()
+        return True
+    except Exception as e:
+        print(f"DEBUG: Cascade fast tier failed to load, serving the full model only: {e}")
+        _cascade_error = str(e)
+        return False
+
+
+def cascade_stats():
+    """Returns escalation rate and cost per image of the cascade, or None if it is disabled."""
+    cascade = get_cascade()
+    return cascade.stats() if cascade is not None else None
+
+
+# Shared request queue that coalesces concurrent sessions into batches
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def _predict_with_engine(batch):
+    # Looked up per batch so a backend switch takes effect immediately
+    cascade = get_cascade()
+    if cascade is not None and _fast_tier_ready(cascade):
+        return cascade.predict(batch)
+    return get_engine().predict(batch)
+
+
+def get_batcher(max_batch_size=None, max_wait_ms=None):
+    """Returns the process-wide micro-batcher in front of the engine.
+
+    Arguments only take effect on the first call; defaults come from
+    SKIN_BATCH_MAX_SIZE and SKIN_BATCH_MAX_WAIT_MS.
+    """
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                options = {}
+                if max_batch_size is not None:
+                    options["max_batch_size"] = max_batch_size
+                if max_wait_ms is not None:
+                    options["max_wait_ms"] = max_wait_ms
+                _batcher = MicroBatcher(_predict_with_engine, **options)
+    return _batcher
+
+
+# Background loading, so pages that never run inference render immediately
+_load_state = {"state": "idle", "error": None}
+_load_thread = None
+_load_lock = threading.Lock()
+
+
+def _load_in_background():
+    try:
+        get_engine().load()
+        cascade = get_cascade()
+        if cascade is not None:
+            _fast_tier_ready(cascade)  # A broken fast tier only disables the cascade
+        _load_state.update(state="ready", error=None)
+    except Exception as e:
+        print(f"DEBUG: Skin analysis model failed to load: {e}")
+        _load_state.update(state="error", error=str(e))
+    _publish_readiness()
+
+
+def start_model_loading():
+    """Starts loading the model on a background thread, once per process.
+
+    Safe to call on every Streamlit rerun; a failed load is retried.
     """
-    global model  # Ensure we use the loaded model
+    global _load_thread
+    with _load_lock:
+        if _load_thread is None or _load_state["state"] == "error":
+            _load_state.update(state="loading", error=None)
+            _load_thread = threading.Thread(target=_load_in_background, name="skin-model-loader", daemon=True)
+            _load_thread.start()
+    _publish_readiness()
+
+
+def model_status():
+    """Returns the model readiness: state is "idle", "loading", "ready" or "error"."""
+    status = dict(_load_state)
+    if _engine is not None:
+        status["backend"] = _engine.backend
+        status["version"] = _engine.version
+    return status
+
+
+def readiness():
+    """Readiness report for health checks.
+
+    Returns:
+        dict: `ready` is True once a warmed-up model is serving. Also holds the
+              load state, backend, model version, the warm latency in ms
+              per warmed batch size and, with the cascade enabled, whether
+              its fast tier is loaded (`cascade`).
+    """
+    report = model_status()
+    report["ready"] = _engine is not None and _engine.model is not None
+    report["warm_latency_ms"] = dict(_engine.warm_latency_ms) if _engine is not None else {}
+    if _cascade is not None:
+        report["cascade"] = {"backend": _cascade.fast.backend, "ready": _cascade.fast.model is not None,
+                             "error": _cascade_error}
+    return report
+
+
+def _publish_readiness():
+    """Writes the readiness report to SKIN_READINESS_FILE, if configured."""
+    if not READINESS_FILE:
+        return
+    tmp_path = READINESS_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(readiness(), f)
+    os.replace(tmp_path, READINESS_FILE)  # Pollers never see a partial file
+
+
+HEAD_LABELS = [
+    SKIN_TONE_LABELS, SKIN_TYPE_LABELS, SKIN_CONCERN_LABELS,
+    SKIN_TEXTURE_LABELS, SKIN_UNDERTONE_LABELS
+]
+
+
+def _load_image(image):
+    """Returns an RGB NumPy array for a file path, PIL image or array."""
+    if isinstance(image, (str, os.PathLike)):
+        if not image or not os.path.exists(image):
+            raise ValueError("Invalid image path. Please provide a valid image file.")
+        with Image.open(image) as img:
+            # JPEGs are decoded at the smallest DCT scale that still covers the
+            # model input, since the whole image is resized to INPUT_SIZE anyway
+            img.draft("RGB", INPUT_SIZE)
+            return np.array(img.convert("RGB"))
+    if isinstance(image, Image.Image):
+        return np.array(image.convert("RGB"))
+    image = np.asarray(image)
+    if image.ndim != 3 or image.shape[2] != 3:
+        raise ValueError(f"Expected an RGB image array of shape (H, W, 3), got {image.shape}")
+    return image
+
+
+def preprocess_image(image):
+    """Resizes and enhances one image into a (224, 224, 3) uint8 array.
+
+    The image is resized first, so the contrast and brightness math runs in
+    place on one small float32 buffer instead of on full-resolution copies.
+    Scaling to [0, 1] happens inside the model graph (see models/backends.py).
+    """
+    img = _load_image(image)
+
+    # Resize with better quality
+    img = cv2.resize(img, INPUT_SIZE, interpolation=cv2.INTER_CUBIC).astype(np.float32)
+
+    # Apply image enhancement techniques (same math as tf.image.adjust_contrast/adjust_brightness)
+    mean = img.mean(axis=(0, 1))
+    img -= mean
+    img *= CONTRAST_FACTOR
+    img += mean
+    np.clip(img, 0, 255, out=img)
+    img += BRIGHTNESS_DELTA
+    np.clip(img, 0, 255, out=img)
+    return np.rint(img, out=img).astype(np.uint8)
+
+
+# Analysis results keyed by face-crop content and model version
+RESULT_CACHE_SIZE = int(os.environ.get("SKIN_RESULT_CACHE_SIZE", 1024))
+_result_cache = LRUCache(RESULT_CACHE_SIZE)
+
+
+def _result_cache_key(img, engine):
+    """Hashes the decoded face crop together with the model(s) being served."""
+    digest = hashlib.blake2b(np.ascontiguousarray(img).data, digest_size=16).hexdigest()
+    _, version = engine.snapshot()
+    cascade = get_cascade()
+    if cascade is not None:
+        return (digest, img.shape, engine.backend, version, cascade.fast.backend, cascade.fast.snapshot()[1])
+    return (digest, img.shape, engine.backend, version)
+
+
+def _store_result(key, sample):
+    """Caches the labels and per-head probability vectors of one sample."""
+    entry = {
+        "labels": _decode_predictions(sample),
+        "probabilities": {name: np.array(head) for name, head in zip(HEAD_NAMES, sample)},
+    }
+    _result_cache.put(key, entry)
+    return entry
 
-    if not image_path or not os.path.exists(image_path):
+
+def analysis_cache_stats():
+    """Returns size and hit/miss counters of the analysis result cache."""
+    return _result_cache.stats()
+
+
+def clear_analysis_cache():
+    _result_cache.clear()
+
+
+def _decode_predictions(sample):
+    """Maps the per-head probability vectors of one sample to label strings."""
+    labels = [HEAD_LABELS[head][np.argmax(sample[head])] for head in range(4)]
+
+    # For backward compatibility, provide a default undertone if the model doesn't have it yet
+    if len(sample) >= 5:
+        labels.append(SKIN_UNDERTONE_LABELS[np.argmax(sample[4])])
+    else:
+        # Default to neutral if undertone prediction is not available
+        labels.append("Neutral")
+    return tuple(labels)
+
+
+def analyze_skin_batch(images, force_refresh=False):
+    """Analyzes many face crops with a single forward pass.
+
+    Args:
+        images (list): Image file paths, PIL images or RGB arrays (H, W, 3).
+        force_refresh (bool): If True, reloads the model first when the model
+                              file changed on disk.
+
+    Returns:
+        list: One (skin_tone, skin_type, skin_concern, skin_texture, skin_undertone)
+              tuple per input image, in input order.
+    """
+    if len(images) == 0:
+        return []
+
+    try:
+        engine = get_engine()
+        if force_refresh:
+            reload_model()
+
+        imgs = [_load_image(image) for image in images]
+        keys = [_result_cache_key(img, engine) for img in imgs]
+        entries = [_result_cache.get(key) for key in keys]
+
+        # Only images not seen before go through the forward pass
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing:
+            batch = np.stack([preprocess_image(imgs[i]) for i in missing])
+            predictions = _predict_with_engine(batch)
+            for row, i in enumerate(missing):
+                entries[i] = _store_result(keys[i], [head[row] for head in predictions])
+
+        results = [entry["labels"] for entry in entries]
+        print(f"DEBUG: Batch analysis of {len(images)} images -> {results}")
+        return results
+
+    except Exception as e:
+        raise ValueError(f"ERROR: Skin analysis failed: {e}")
+
+
+def analyze_skin(image_path, force_refresh=False):
+    """Analyzes skin tone, type, texture, concerns, and undertone from an image.
+
+    Args:
+        image_path (str): Path to the image file. An already decoded RGB array
+                          or PIL image is accepted too (see models/pipeline.py).
+        force_refresh (bool): If True, reloads the model first when the model
+                              file changed on disk.
+
+    Returns:
+        tuple: (skin_tone, skin_type, skin_concern, skin_texture, skin_undertone)
+    """
+    if isinstance(image_path, (str, os.PathLike)) and (not image_path or not os.path.exists(image_path)):
         raise ValueError("Invalid image path. Please provide a valid image file.")
+    if image_path is None:
+        raise ValueError("No image provided. Please provide a valid image file.")
 
     try:
-        # Get current model state ID from session state or create it
-        current_state_id = st.session_state.get('model_state_id', 0)
-        
-        # Store the last model state ID we used
-        if 'last_model_state_id' not in st.session_state:
-            st.session_state.last_model_state_id = -1
-        
-        # Check if we need to reload the model based on state change
-        model_state_changed = current_state_id != st.session_state.last_model_state_id
-        
-        # Reload Model if Forced Refresh or State Changed
-        if force_refresh or model_state_changed:
-            print(f"DEBUG: Forcing model reload for fresh analysis... State ID: {current_state_id}")
-            # Clear TensorFlow session to release previous model resources
-            tf.keras.backend.clear_session()
-            # Set model to None to force a complete reload
-            global model
-            model = None
-            # Reload the model
-            model = load_model()
-            # Update the last model state ID
-            st.session_state.last_model_state_id = current_state_id
-
-        # Load and preprocess image
-        img = Image.open(image_path).convert("RGB")
-        
-        # Apply image enhancement techniques
-        img = tf.image.adjust_contrast(np.array(img), 1.2)  # Slightly increase contrast
-        img = tf.image.adjust_brightness(img, 0.1)  # Slightly increase brightness
-        
-        # Resize with better quality
-        img = tf.image.resize(img, (224, 224), method=tf.image.ResizeMethod.BICUBIC)
-        img_array = np.array(img) / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        # Disable TensorFlow caching for this prediction
-        tf.config.experimental.set_synchronous_execution(True)
-        
-        # Ensure model is loaded before making predictions
-        if model is None:
-            raise ValueError("Skin analysis model is not loaded. Check model initialization.")
-
-        # Make predictions with caching disabled
-        with tf.device('/CPU:0'):  # Force CPU execution to avoid GPU caching
-            predictions = model.predict(img_array, verbose=0)
-
-        # Debugging: Print raw predictions
-        print(f"DEBUG: Model Predictions -> {predictions}")
-
-        # Extract skin attributes
-        skin_tone = SKIN_TONE_LABELS[np.argmax(predictions[0])]
-        skin_type = SKIN_TYPE_LABELS[np.argmax(predictions[1])]
-        skin_concern = SKIN_CONCERN_LABELS[np.argmax(predictions[2])]
-        skin_texture = SKIN_TEXTURE_LABELS[np.argmax(predictions[3])]
-        
-        # For backward compatibility, provide a default undertone if the model doesn't have it yet
-        if len(predictions) >= 5:
-            skin_undertone = SKIN_UNDERTONE_LABELS[np.argmax(predictions[4])]
-        else:
-            # Default to neutral if undertone prediction is not available
-            skin_undertone = "Neutral"
+        engine = get_engine()
+        if force_refresh:
+            reload_model()
+
+        # Repeat uploads of the same face are answered from the result cache
+        img = _load_image(image_path)
+        key = _result_cache_key(img, engine)
+        entry = _result_cache.get(key)
+        if entry is None:
+            # Concurrent sessions share one forward pass through the micro-batcher
+            predictions = get_batcher().predict(preprocess_image(img), timeout=PREDICT_TIMEOUT)
+
+            # Debugging: Print raw predictions
+            print(f"DEBUG: Model Predictions -> {predictions}")
+
+            entry = _store_result(key, predictions)
+
+        skin_tone, skin_type, skin_concern, skin_texture, skin_undertone = entry["labels"]
 
         # Debugging: Print selected results
         print(f"DEBUG: Analysis Results -> Tone: {skin_tone}, Type: {skin_type}, Concern: {skin_concern}, Texture: {skin_texture}, Undertone: {skin_undertone}")
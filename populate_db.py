@@ -1,5 +1,5 @@
 import pymysql
-from itertools import product
+from itertools import count, product
 import random
 
 # --- Skincare & Makeup Attributes ---
@@ -90,9 +90,52 @@ try:
     print("✅ Connected to database.")
 
     # --- Clear existing data (optional) ---
-    cursor.execute("TRUNCATE TABLE products")
+    # The junction tables reference products, so foreign key checks are
+    # paused for the truncates
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in ("product_concerns", "product_textures", "products"):
+        cursor.execute(f"TRUNCATE TABLE {table}")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
     print("🧹 Cleared existing products.")
 
+    # --- Lookup ids for the junction tables (seeded by sql.sql) ---
+    cursor.execute("SELECT name, id FROM skin_concerns")
+    concern_ids = dict(cursor.fetchall())
+    cursor.execute("SELECT name, id FROM skin_textures")
+    texture_ids = dict(cursor.fetchall())
+
+    product_query = """
+    INSERT INTO products (
+        id, name, category, subcategory, skin_tone, skin_type,
+        undertone, shade, finish, link, image_path, recommendation, makeup_recommendation
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+    """
+    concern_query = "INSERT INTO product_concerns (product_id, concern_id) VALUES (%s, %s)"
+    texture_query = "INSERT INTO product_textures (product_id, texture_id) VALUES (%s, %s)"
+
+    # Rows are buffered and written with multi-row INSERTs. Ids are assigned
+    # here (the tables were just truncated), so junction rows need no lastrowid.
+    BATCH_SIZE = 5000
+    product_ids = count(1)
+    pending_products, pending_concerns, pending_textures = [], [], []
+
+    def flush():
+        """Writes the buffered rows, products first for the foreign keys."""
+        cursor.executemany(product_query, pending_products)
+        cursor.executemany(concern_query, pending_concerns)
+        cursor.executemany(texture_query, pending_textures)
+        for rows in (pending_products, pending_concerns, pending_textures):
+            rows.clear()
+
+    def insert_product(values, skin_concern, skin_texture):
+        """Buffers one product row and the links to its concern and texture."""
+        product_id = next(product_ids)
+        pending_products.append((product_id,) + values)
+        pending_concerns.append((product_id, concern_ids[skin_concern]))
+        pending_textures.append((product_id, texture_ids[skin_texture]))
+        if len(pending_products) >= BATCH_SIZE:
+            flush()
+
     # --- Skincare Products Insert ---
     print("🔄 Inserting skincare products...")
     skincare_count = 0
@@ -113,22 +156,17 @@ try:
         recommendation = generate_recommendation(skin_type, skin_concern)
         makeup_recommendation = None
 
-        query = """
-        INSERT INTO products (
-            name, category, subcategory, skin_tone, skin_type, skin_concern, skin_texture,
-            undertone, shade, finish, link, recommendation, makeup_recommendation
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
-        """
-        cursor.execute(query, (
-            product_name, category, subcategory, skin_tone, skin_type, skin_concern, skin_texture,
-            undertone, shade, finish, link, recommendation, makeup_recommendation
-        ))
+        insert_product((
+            product_name, category, subcategory, skin_tone, skin_type,
+            undertone, shade, finish, link, "", recommendation, makeup_recommendation
+        ), skin_concern, skin_texture)
         skincare_count += 1
         
         # Print progress every 500 items
         if skincare_count % 500 == 0:
             print(f"  Progress: {skincare_count} skincare products inserted...")
 
+    flush()
     print(f"✅ {skincare_count} skincare products inserted.")
 
     # --- Makeup Products Insert ---
@@ -158,22 +196,22 @@ try:
         # For makeup products, use a generic skincare recommendation based on skin type and concern
         recommendation = f"For {skin_type.lower()} skin with {skin_concern.lower()}, consider skincare that complements your makeup routine."
         
-        query = """
-        INSERT INTO products (
-            name, category, subcategory, skin_tone, skin_type, skin_concern, skin_texture,
-            undertone, shade, finish, link, recommendation, makeup_recommendation
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
-        """
-        cursor.execute(query, (
-            product_name, category, subcategory, skin_tone, skin_type, skin_concern, skin_texture,
-            undertone, shade, finish, link, recommendation, makeup_recommendation
-        ))
+        insert_product((
+            product_name, category, subcategory, skin_tone, skin_type,
+            undertone, shade, finish, link, "", recommendation, makeup_recommendation
+        ), skin_concern, skin_texture)
         makeup_count += 1
         
         # Print progress every 5000 items
         if makeup_count % 5000 == 0:
             print(f"  Progress: {makeup_count} makeup products inserted...")
 
+    flush()
+
+    # Tell running app processes to drop their cached recommendations
+    cursor.execute("INSERT INTO catalog_version (id, version) VALUES (1, 1) "
+                   "ON DUPLICATE KEY UPDATE version = version + 1")
+
     connection.commit()
     print(f"✅ {makeup_count} makeup products inserted.")
     print(f"🎉 Total: {skincare_count + makeup_count} products inserted successfully.")
@@ -1,17 +1,89 @@
+-- Lookup tables for the multi-valued attributes
+CREATE TABLE `skin_concerns` (
+  `id` tinyint(3) UNSIGNED NOT NULL AUTO_INCREMENT,
+  `name` varchar(50) NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_skin_concerns_name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `skin_textures` (
+  `id` tinyint(3) UNSIGNED NOT NULL AUTO_INCREMENT,
+  `name` varchar(50) NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_skin_textures_name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO `skin_concerns` (`name`) VALUES
+('Cystic Acne'), ('Blackheads'), ('Whiteheads'),
+('Hyperpigmentation'), ('Melasma'), ('Dark Spots'),
+('Fine Lines'), ('Wrinkles'), ('Aging'),
+('Dullness'), ('Dehydration'),
+('Redness'), ('Rosacea'), ('Irritation'), ('Sunburn');
+
+INSERT INTO `skin_textures` (`name`) VALUES
+('Velvety'), ('Soft'), ('Smooth'),
+('Flaky'), ('Harsh'), ('Rough'),
+('Patchy'), ('Uneven'), ('Bumpy'),
+('Large Pores'),
+('Peeling'), ('Tight'), ('Scaly');
+
+-- Single-valued attributes are ENUMs; concerns and textures live in the
+-- junction tables below. Equality on the ENUM columns is case-insensitive
+-- under the default collation, like the LOWER(...) comparisons it replaces.
 CREATE TABLE `products` (
-  `id` int(11) NOT NULL,
+  `id` int(11) NOT NULL AUTO_INCREMENT,
   `name` varchar(255) NOT NULL,
-  `category` varchar(255) NOT NULL,
-  `skin_tone` varchar(255) NOT NULL,
-  `skin_texture` varchar(255) NOT NULL,
-  `skin_concern` text NOT NULL,
-  `skin_type` varchar(255) NOT NULL,
-  `link` text NOT NULL,
-  `image_path` text NOT NULL,
-  `recommendation` text NOT NULL,
+  `category` enum('Skincare','Makeup') NOT NULL,
   `subcategory` varchar(50) DEFAULT NULL,
-  `undertone` varchar(20) DEFAULT NULL,
+  `skin_tone` enum('Fair','Medium','Dark') NOT NULL,
+  `skin_type` enum('Normal','Dry','Oily','Combination','Sensitive') NOT NULL,
+  `undertone` enum('Cool','Neutral','Warm') DEFAULT NULL,
   `shade` varchar(50) DEFAULT NULL,
   `finish` varchar(50) DEFAULT NULL,
-  `makeup_recommendation` text DEFAULT NULL
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
\ No newline at end of file
+  `link` text NOT NULL,
+  `image_path` text NOT NULL,
+  `recommendation` text NOT NULL,
+  `makeup_recommendation` text DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  -- Matches the recommend queries: category, tone and type always, undertone for makeup
+  KEY `idx_products_profile` (`category`, `skin_tone`, `skin_type`, `undertone`),
+  KEY `idx_products_name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `product_concerns` (
+  `product_id` int(11) NOT NULL,
+  `concern_id` tinyint(3) UNSIGNED NOT NULL,
+  PRIMARY KEY (`concern_id`, `product_id`),
+  KEY `idx_product_concerns_product` (`product_id`),
+  CONSTRAINT `fk_product_concerns_product` FOREIGN KEY (`product_id`) REFERENCES `products` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `fk_product_concerns_concern` FOREIGN KEY (`concern_id`) REFERENCES `skin_concerns` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `product_textures` (
+  `product_id` int(11) NOT NULL,
+  `texture_id` tinyint(3) UNSIGNED NOT NULL,
+  PRIMARY KEY (`texture_id`, `product_id`),
+  KEY `idx_product_textures_product` (`product_id`),
+  CONSTRAINT `fk_product_textures_product` FOREIGN KEY (`product_id`) REFERENCES `products` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `fk_product_textures_texture` FOREIGN KEY (`texture_id`) REFERENCES `skin_textures` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Precomputed ranked products per packed profile code
+-- (filled by: python -m models.profile_recommendations --table)
+CREATE TABLE `profile_recommendations` (
+  `profile_code` smallint(5) UNSIGNED NOT NULL,
+  `product_rank` smallint(5) UNSIGNED NOT NULL,
+  `product_id` int(11) NOT NULL,
+  PRIMARY KEY (`profile_code`, `product_rank`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Bumped by every catalog write (populate_db.py, bump_catalog_version() in
+-- models/recommender.py); the app drops its cached recommendations when it changes
+CREATE TABLE `catalog_version` (
+  `id` tinyint(3) UNSIGNED NOT NULL,
+  `version` bigint(20) UNSIGNED NOT NULL DEFAULT 0,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO `catalog_version` (`id`, `version`) VALUES (1, 0);